@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Exfiltration guard for Bash, Write and Edit tool calls, answered by a persistent daemon.
+
+Security model: the devcontainer is disposable, so local destruction (deleting
+files, sudo, dropping databases, force pushes) is allowed. The guard only blocks
+commands that publish code or could leak secrets outside the container, and
+writes or edits that put a secret into a file, where it could be committed.
+Edits are checked by their new text and writes by the part that differs from the
+file on disk; the daemon remembers clean texts by hash, so repeated edits to
+large files cost time proportional to the change.
+
+As a PreToolUse hook the script reads the hook payload on stdin, asks the daemon
+for a decision over a Unix socket and exits 2 with the reason on stderr when the
+command is blocked, exactly like the shell hook. When no daemon answers it
+decides in-process and starts one in the background for the next call. The
+client path imports only ``os``, ``socket`` and ``sys``; the rules are compiled
+once in the daemon. A payload that cannot be checked is blocked, so an error in
+the guard never lets a call through.
+
+Usage:
+    dangerous_actions_blocker.py < payload.json     # hook client
+    dangerous_actions_blocker.py --serve            # run the daemon in the foreground
+    dangerous_actions_blocker.py --bench [N]        # report p50/p99 decision latency
+"""
+
+import os
+import socket
+import sys
+
+SOCKET_ENV = "DANGEROUS_ACTIONS_SOCKET"
+# Set to "0" to decide in-process without starting a daemon
+DAEMON_ENV = "DANGEROUS_ACTIONS_DAEMON"
+BLOCK_EXIT = 2
+IDLE_TIMEOUT = 3600.0
+CLIENT_TIMEOUT = 1.0
+
+# Set to a bits-per-character threshold (4.5 suits base64 keys) to also block high-entropy tokens
+ENTROPY_ENV = "DANGEROUS_ACTIONS_ENTROPY"
+
+# Tools whose payload writes file content
+FILE_TOOLS = ("Write", "Edit", "MultiEdit")
+# Clean texts remembered by the daemon, oldest forgotten first
+CLEAN_CACHE_SIZE = 4096
+# Characters past a span's end that a secret starting in it may need: enough for the longest
+# SECRET_RULES match and an entropy token of secret_scanner.DEFAULT_MAX_TOKEN_LENGTH plus one
+SCAN_REACH = 257
+
+# (literal, regex, reason) signatures for secret_scanner. The regex is matched where the
+# literal starts a word; without one the literal must appear as a whole word. A Bash command
+# matching a command rule or secret rule is blocked, and so is a file change adding a secret.
+COMMAND_RULES: list[tuple[str, str | None, str]] = [
+    ("gh", r"gh\s+gist\s+create\b", "gh gist create publishes content outside the devcontainer"),
+    ("gh", r"gh\s+issue\s+create\b.*\s--body\b", "gh issue create --body can publish secrets in the issue text"),
+    ("twine", r"twine\s+upload\b", "twine upload publishes a package"),
+    ("npm", r"npm\s+publish\b", "npm publish publishes a package"),
+    ("uv", r"uv\s+publish\b", "uv publish publishes a package"),
+    ("ANTHROPIC_API_KEY", None, "the command references ANTHROPIC_API_KEY"),
+    ("AWS_SECRET_ACCESS_KEY", None, "the command references AWS_SECRET_ACCESS_KEY"),
+]
+SECRET_RULES: list[tuple[str, str | None, str]] = [
+    ("AKIA", r"AKIA[0-9A-Z]{16}\b", "an AWS access key ID (AKIA...)"),
+    ("sk-", r"sk-[A-Za-z0-9_-]{20,}", "a secret API key (sk-...)"),
+    ("ghp_", r"ghp_[A-Za-z0-9]{36}\b", "a GitHub personal access token (ghp_...)"),
+]
+RULES = COMMAND_RULES + SECRET_RULES
+
+_scanners: dict[float | None, tuple] = {}
+_clean: dict[tuple[float | None, int, int, bytes], None] = {}
+
+
+def _scanner_module():
+    """Import ``secret_scanner`` from the directory of this hook."""
+    hooks_dir = os.path.dirname(os.path.abspath(__file__))
+    if hooks_dir not in sys.path:
+        sys.path.insert(0, hooks_dir)
+    import secret_scanner
+
+    return secret_scanner
+
+
+def _entropy_threshold(entropy: str) -> float | None:
+    """Parse a ``DANGEROUS_ACTIONS_ENTROPY`` value; an empty value disables the entropy check."""
+    if not entropy:
+        return None
+    try:
+        threshold = float(entropy)
+    except ValueError:
+        threshold = float("nan")
+    if not threshold > 0:
+        raise ValueError(f"{ENTROPY_ENV} must be a positive number of bits per character, not {entropy!r}")
+    return threshold
+
+
+def _compiled(entropy: str | None = None):
+    """Return the command and file scanners for an entropy setting, compiling them on first use.
+
+    :param entropy: ``DANGEROUS_ACTIONS_ENTROPY`` value, read from the environment when None
+    """
+    threshold = _entropy_threshold(os.environ.get(ENTROPY_ENV, "") if entropy is None else entropy)
+    if threshold not in _scanners:
+        scanner = _scanner_module()
+        _scanners[threshold] = (
+            scanner.SecretScanner([scanner.Signature(*rule) for rule in RULES], threshold),
+            scanner.SecretScanner([scanner.Signature(*rule) for rule in SECRET_RULES], threshold),
+        )
+    return _scanners[threshold]
+
+
+def _check_command(command: str, scanner) -> str | None:
+    finding = scanner.first(command)
+    if finding is None:
+        return None
+    if any(finding.description == reason for _, _, reason in COMMAND_RULES):
+        return finding.description
+    return f"the command contains {finding.description}"
+
+
+def _current_content(path: str) -> str:
+    """Return the text of the file at ``path``, or an empty string if it cannot be read."""
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            return f.read()
+    except (OSError, ValueError):
+        return ""
+
+
+def _first_secret(text: str, start: int, end: int, scanner) -> str | None:
+    """Return the description of the first secret in ``text[start:end]``, remembering clean spans by hash.
+
+    The scan is clamped to a window of one character before the span, for the word boundary at its
+    start, and ``SCAN_REACH`` characters after it. The verdict depends on nothing outside the window,
+    so the window, not just the span, is what a clean verdict is remembered by.
+    """
+    import hashlib
+
+    low, high = max(0, start - 1), min(len(text), end + SCAN_REACH)
+    window = text[low:high]
+    digest = hashlib.blake2b(window.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    key = (scanner.entropy_threshold, start - low, end - low, digest)
+    if key in _clean:
+        return None
+    finding = scanner.first(window, start - low, end - low)
+    if finding is not None:
+        return finding.description
+    _clean[key] = None
+    if len(_clean) > CLEAN_CACHE_SIZE:
+        del _clean[next(iter(_clean))]
+    return None
+
+
+def _check_file_change(tool_name: str, tool_input: dict, cwd: str | None, secrets) -> str | None:
+    scanner = _scanner_module()
+    path = tool_input.get("file_path")
+    if not isinstance(path, str):
+        return None
+    if tool_name == "Write":
+        content = tool_input.get("content")
+        if not isinstance(content, str):
+            return None
+        # The margin covers secrets that cross the edges of the change
+        current = _current_content(os.path.join(cwd or "", path))
+        changes = [(content, *scanner.changed_span(current, content, margin=scanner.DEFAULT_MAX_TOKEN_LENGTH))]
+    else:
+        edits = tool_input.get("edits") if tool_name == "MultiEdit" else [tool_input]
+        if not isinstance(edits, list) or not all(isinstance(edit, dict) for edit in edits):
+            return f"{tool_name} edits for {path} are not a list of objects and cannot be checked"
+        texts = [edit.get("new_string") for edit in edits]
+        changes = [(text, 0, len(text)) for text in texts if isinstance(text, str)]
+    for text, start, end in changes:
+        if description := _first_secret(text, start, end, secrets):
+            return f"{tool_name} would add {description} to {path}"
+    return None
+
+
+def evaluate(payload: bytes, entropy: str | None = None) -> str | None:
+    """Decide on a hook payload.
+
+    :param payload: raw PreToolUse hook JSON
+    :param entropy: ``DANGEROUS_ACTIONS_ENTROPY`` value of the hook, read from the environment when None
+    :return: the reason to block the tool call, or None to allow it
+    :raises ValueError: if the entropy setting is not a positive number
+    """
+    import json
+
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not isinstance(tool_input := data.get("tool_input"), dict):
+        return None
+    tool_name = data.get("tool_name")
+    if tool_name == "Bash":
+        command = tool_input.get("command")
+        return _check_command(command, _compiled(entropy)[0]) if isinstance(command, str) else None
+    if tool_name in FILE_TOOLS:
+        cwd = data.get("cwd")
+        return _check_file_change(tool_name, tool_input, cwd if isinstance(cwd, str) else None, _compiled(entropy)[1])
+    return None
+
+
+def decide(payload: bytes, entropy: str | None = None) -> str | None:
+    """Like :func:`evaluate`, but turn any error into a reason to block, so the guard fails closed."""
+    try:
+        return evaluate(payload, entropy)
+    except Exception as exc:
+        return f"the hook could not check this call ({type(exc).__name__}: {exc})"
+
+
+def _source_mtimes() -> tuple[int, ...]:
+    """Return the modification times of this hook and the secret scanner it imports."""
+    return tuple(os.stat(path).st_mtime_ns for path in (__file__, _scanner_module().__file__))
+
+
+def socket_path() -> str:
+    """Return the daemon socket path (``$DANGEROUS_ACTIONS_SOCKET`` or a per-user runtime directory)."""
+    if path := os.environ.get(SOCKET_ENV):
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/claude-hooks-{os.getuid()}"
+    return os.path.join(runtime, "dangerous-actions-blocker.sock")
+
+
+def _recv_all(conn: socket.socket) -> bytes:
+    chunks = []
+    while chunk := conn.recv(1 << 16):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def ask_daemon(path: str, payload: bytes) -> bytes | None:
+    """Send a payload to the daemon and return its raw answer, or None if no daemon answered.
+
+    The request is this process's ``DANGEROUS_ACTIONS_ENTROPY`` value on the first
+    line, followed by the payload, so the setting applies per call rather than as
+    it was when the daemon started. Sockets in a directory owned by another user
+    are ignored, so nobody else can answer for this user's hook.
+    """
+    try:
+        if os.stat(os.path.dirname(path) or ".").st_uid != os.getuid():
+            return None
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(CLIENT_TIMEOUT)
+            conn.connect(path)
+            conn.sendall(os.environ.get(ENTROPY_ENV, "").encode() + b"\n" + payload)
+            conn.shutdown(socket.SHUT_WR)
+            answer = _recv_all(conn)
+    except OSError:
+        return None
+    return answer or None
+
+
+def serve(path: str, idle_timeout: float = IDLE_TIMEOUT) -> None:
+    """Answer hook requests on a Unix socket.
+
+    Answers are ``0`` to allow or ``2`` followed by the reason to block; a request
+    that fails to evaluate is blocked and the daemon keeps serving. The daemon
+    exits after ``idle_timeout`` seconds without requests, or after the request
+    that follows an edit of this file or of ``secret_scanner.py``, so changed rules
+    take effect on the next call. A lock file keeps a single daemon per socket.
+
+    :param path: socket path
+    :param idle_timeout: seconds to wait for a request before exiting
+    """
+    import fcntl
+
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        _compiled("")  # compile the rules before the first request
+        source_mtimes = _source_mtimes()
+        if os.path.exists(path):
+            os.unlink(path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(path)
+            os.chmod(path, 0o600)
+            server.listen(64)
+            server.settimeout(idle_timeout)
+            try:
+                while True:
+                    try:
+                        conn, _ = server.accept()
+                    except TimeoutError:
+                        break
+                    with conn:
+                        conn.settimeout(CLIENT_TIMEOUT)
+                        try:
+                            entropy, _, payload = _recv_all(conn).partition(b"\n")
+                            reason = decide(payload, entropy.decode(errors="replace"))
+                            conn.sendall(b"0" if reason is None else b"2" + reason.encode(errors="replace"))
+                        except OSError:
+                            pass
+                    try:
+                        if _source_mtimes() != source_mtimes:
+                            break
+                    except OSError:
+                        break
+            finally:
+                os.unlink(path)
+
+
+def start_daemon() -> None:
+    """Start a detached daemon for later calls; failures are ignored."""
+    import subprocess
+
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        pass
+
+
+BENCH_COMMANDS = [
+    "uv run pytest -q",
+    "git status && git diff --stat",
+    "gh pr create --title 'Fix parser' --body-file pr.md",
+    "gh gist create notes.md",
+    "echo $ANTHROPIC_API_KEY",
+    "cat <<'EOF' > big.txt\n" + "static text with no secrets at all\n" * 2000 + "EOF",
+]
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    """Return the p50 and p99 of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def bench(count: int) -> dict[str, tuple[float, float]]:
+    """Measure decision latency in-process and through a daemon process on a temporary socket.
+
+    :param count: number of decisions per mode
+    :return: ``{"in-process": (p50, p99), "daemon": (p50, p99)}`` in milliseconds
+    """
+    import json
+    import subprocess
+    import tempfile
+    import time
+
+    payloads = [json.dumps({"tool_name": "Bash", "tool_input": {"command": c}}).encode() for c in BENCH_COMMANDS]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blocker.sock")
+        daemon = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve"], env={**os.environ, SOCKET_ENV: path}
+        )
+        try:
+            while ask_daemon(path, b"{}") is None:
+                time.sleep(0.01)
+            for mode, decide in (("in-process", evaluate), ("daemon", lambda p: ask_daemon(path, p))):
+                decide(payloads[0])
+                samples = []
+                for i in range(count):
+                    start = time.perf_counter()
+                    answer = decide(payloads[i % len(payloads)])
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if mode == "daemon" and answer is None:
+                        raise RuntimeError("daemon stopped answering")
+                results[mode] = percentiles(samples)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run as hook client, daemon (``--serve``) or benchmark (``--bench [N]``)."""
+    args = sys.argv[1:] if argv is None else argv
+    if args[:1] == ["--serve"]:
+        serve(socket_path())
+        return 0
+    if args[:1] == ["--bench"]:
+        for mode, (p50, p99) in bench(int(args[1]) if len(args) > 1 else 2000).items():
+            print(f"{mode:<11} p50 {p50:6.3f} ms  p99 {p99:6.3f} ms")
+        return 0
+
+    payload = sys.stdin.buffer.read()
+    answer = ask_daemon(socket_path(), payload)
+    if answer is None:
+        if os.environ.get(DAEMON_ENV) != "0":
+            start_daemon()
+        reason = decide(payload)
+    else:
+        reason = answer[1:].decode(errors="replace") if answer[:1] == b"2" else None
+    if reason is None:
+        return 0
+    print(f"Blocked by dangerous-actions-blocker: {reason}", file=sys.stderr)
+    return BLOCK_EXIT
+
+
+if __name__ == "__main__":
+    sys.exit(main())
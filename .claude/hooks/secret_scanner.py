@@ -0,0 +1,208 @@
+"""Single-pass multi-pattern scanner for secrets and command signatures in hook payloads.
+
+Every signature starts with a fixed literal (``AKIA``, ``ghp_``, ``npm``). The
+literals of all signatures are compiled into one prefix-trie regular expression,
+so the text is searched once, whatever the number of signatures. Only at the
+positions where a literal matches does the scanner run the regexes of the
+signatures starting with that literal. An optional Shannon-entropy check flags
+long random-looking tokens that no signature describes. ``changed_span`` limits a
+scan to the part of a text that an edit changed.
+"""
+
+import math
+import re
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from typing import NamedTuple
+
+# Characters of API keys and tokens: base64, base64url and hex alphabets
+TOKEN_CHARS = r"[A-Za-z0-9+/=_-]"
+# Above this many distinct first characters, checking the word boundary first beats
+# letting the regex engine skip to candidate first characters
+MAX_SKIP_FIRST_CHARS = 16
+DEFAULT_MIN_TOKEN_LENGTH = 32
+DEFAULT_MAX_TOKEN_LENGTH = 256
+ENTROPY_DESCRIPTION = "a high-entropy token"
+# Characters compared at once when looking for the first difference between two texts
+COMPARE_CHUNK = 1 << 16
+
+
+class Signature(NamedTuple):
+    """A pattern to find, anchored on a literal.
+
+    ``pattern`` is matched where ``literal`` occurs and must itself start with
+    ``literal``; without a pattern the literal must appear as a whole word.
+    Literals that start with a word character only match at the start of a word.
+    """
+
+    literal: str
+    pattern: str | None
+    description: str
+
+
+class Finding(NamedTuple):
+    """A match of a signature or a high-entropy token."""
+
+    description: str
+    start: int
+    end: int
+
+
+def shannon_entropy(text: str) -> float:
+    """Return the Shannon entropy of ``text`` in bits per character."""
+    length = len(text)
+    return -sum(count / length * math.log2(count / length) for count in Counter(text).values())
+
+
+def _match_length(same: Callable[[int, int], bool], limit: int) -> int:
+    """Return the largest ``n <= limit`` for which ``same(0, n)`` holds.
+
+    ``same(i, j)`` compares the characters ``i`` to ``j`` of two texts. Whole chunks
+    are compared first and the chunk with the difference is bisected, so long equal
+    runs cost a few slice comparisons instead of a Python loop per character.
+    """
+    pos = hi = 0
+    while pos < limit:
+        hi = min(pos + COMPARE_CHUNK, limit)
+        if not same(pos, hi):
+            break
+        pos = hi
+    else:
+        return limit
+    while hi - pos > 1:
+        mid = (pos + hi) // 2
+        if same(pos, mid):
+            pos = mid
+        else:
+            hi = mid
+    return pos
+
+
+def changed_span(old: str, new: str, margin: int = 0) -> tuple[int, int]:
+    """Return the span of ``new`` that differs from ``old``.
+
+    :param old: previous text
+    :param new: edited text
+    :param margin: characters of unchanged context to include on both sides, so
+        matches crossing the edges of the change are still found
+    :return: ``(start, end)`` offsets into ``new``; empty when the texts are equal
+    """
+    if old == new:
+        return len(new), len(new)
+    prefix = _match_length(lambda i, j: old[i:j] == new[i:j], min(len(old), len(new)))
+    old_end, new_end = len(old), len(new)
+    suffix = _match_length(
+        lambda i, j: old[old_end - j : old_end - i] == new[new_end - j : new_end - i],
+        min(len(old), len(new)) - prefix,
+    )
+    return max(0, prefix - margin), min(new_end, new_end - suffix + margin)
+
+
+def _trie(literals: Iterable[str]) -> dict:
+    trie: dict = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+    return trie
+
+
+def _trie_regex(node: dict, after_first: str = "") -> str:
+    """Return a regex matching the literals of a trie, sharing common prefixes.
+
+    No literal in the trie may be a prefix of another, so a match is always a whole
+    literal. ``after_first`` is inserted after the first character of each literal.
+    """
+    branches = [re.escape(char) + after_first + _trie_regex(child) for char, child in sorted(node.items())]
+    if len(branches) <= 1:
+        return "".join(branches)
+    return "(?:" + "|".join(branches) + ")"
+
+
+def _word_start_regex(literals: list[str]) -> str:
+    """Return a regex matching ``literals`` (all starting with a word character) at the start of a word."""
+    trie = _trie(literals)
+    if len(trie) <= MAX_SKIP_FIRST_CHARS:
+        # The engine jumps between occurrences of the few first characters; the
+        # lookbehind then checks the character before the literal
+        return _trie_regex(trie, after_first=r"(?<!\w.)")
+    return rf"\b{_trie_regex(trie)}"
+
+
+class SecretScanner:
+    """Scan text for many signatures in one pass.
+
+    :param signatures: signatures to look for
+    :param entropy_threshold: also report tokens of ``min_token_length`` to
+        ``max_token_length`` characters whose entropy exceeds this many bits per
+        character; None disables the check
+    :param min_token_length: shortest token checked for entropy
+    :param max_token_length: longest token checked for entropy, longer runs are data rather than credentials
+    """
+
+    def __init__(
+        self,
+        signatures: Iterable[Signature],
+        entropy_threshold: float | None = None,
+        min_token_length: int = DEFAULT_MIN_TOKEN_LENGTH,
+        max_token_length: int = DEFAULT_MAX_TOKEN_LENGTH,
+    ) -> None:
+        self.signatures = list(signatures)
+        self.entropy_threshold = entropy_threshold
+        literals = sorted({signature.literal for signature in self.signatures})
+        if "" in literals:
+            raise ValueError("every signature needs a non-empty literal")
+        # A literal extending another is found through the shorter one, which becomes its anchor
+        anchors = [literal for literal in literals if not any(literal.startswith(o) for o in literals if o != literal)]
+        self._candidates: dict[str, list[tuple[re.Pattern, str]]] = {anchor: [] for anchor in anchors}
+        for signature in self.signatures:
+            pattern = signature.pattern
+            if pattern is None:
+                pattern = re.escape(signature.literal) + (r"\b" if re.match(r"\w", signature.literal[-1]) else "")
+            anchor = next(a for a in anchors if signature.literal.startswith(a))
+            self._candidates[anchor].append((re.compile(pattern), signature.description))
+
+        word = [anchor for anchor in anchors if re.match(r"\w", anchor)]
+        other = [anchor for anchor in anchors if anchor not in word]
+        branches = [_word_start_regex(word)] if word else []
+        branches += [_trie_regex(_trie(other))] if other else []
+        self._token = None
+        # How far past its start a hit of the automaton may need to look
+        self._reach = max(map(len, anchors), default=0)
+        if entropy_threshold is not None:
+            self._reach = max(self._reach, min_token_length)
+            self._token = re.compile(rf"{TOKEN_CHARS}{{{min_token_length},{max_token_length}}}(?!{TOKEN_CHARS})")
+            branches.append(rf"\b(?={TOKEN_CHARS}{{{min_token_length}}})")
+        self._automaton = re.compile("|".join(branches)) if branches else None
+
+    def scan(self, text: str, start: int = 0, end: int | None = None) -> Iterator[Finding]:
+        """Yield the findings in ``text`` in order of position.
+
+        :param text: text to scan
+        :param start: offset where matches may start; word boundaries still see the text before it
+        :param end: offset before which matches must start (they may extend past it), None for the end of ``text``
+        :return: iterator of findings; stop early to scan only up to the first one
+        """
+        if self._automaton is None:
+            return
+        end = len(text) if end is None else end
+        endpos = min(len(text), end + self._reach)
+        checked_until = 0
+        pos = start
+        while (hit := self._automaton.search(text, pos, endpos)) is not None and hit.start() < end:
+            at = hit.start()
+            found = False
+            for regex, description in self._candidates.get(hit.group(), ()):
+                if match := regex.match(text, at):
+                    found = True
+                    yield Finding(description, at, match.end())
+            if not found and self._token is not None and at >= checked_until:
+                if token := self._token.match(text, at):
+                    checked_until = token.end()
+                    if shannon_entropy(token.group()) > self.entropy_threshold:
+                        yield Finding(ENTROPY_DESCRIPTION, at, token.end())
+            pos = at + 1
+
+    def first(self, text: str, start: int = 0, end: int | None = None) -> Finding | None:
+        """Return the first finding in ``text`` (or its ``start``-``end`` span), or None if it is clean."""
+        return next(self.scan(text, start, end), None)
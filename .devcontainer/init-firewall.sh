@@ -5,110 +5,159 @@ IFS=$'\n\t'
 # Network security firewall for devcontainer.
 # Restricts egress to: PyPI, GitHub, Anthropic/Claude, VS Code, uv/Astral,
 # plus any domains from WebFetch(domain:...) permission patterns.
-# Uses ipset with aggregated CIDR ranges for reliable filtering.
+# Uses ipset with aggregated CIDR ranges for reliable filtering. The whole
+# allowlist is loaded with one `ipset restore` into a temporary set that is
+# swapped in atomically.
+#
+# Domains are resolved concurrently and the resolved allowlist is cached with
+# its DNS TTLs. A restart reuses cached entries at most STALE_GRACE (300)
+# seconds past their expiry, so an IP is never allowed more than five minutes
+# longer than its DNS TTL; those entries are re-resolved in the background and
+# anything older is resolved again before the firewall comes up.
+#
+# Usage: init-firewall.sh [--refresh | --daemon [--interval SECONDS]]
+#   (no mode)  flush iptables and build the firewall from scratch
+#   --refresh  re-resolve expired entries and swap them into the live ipset
+#              only if it changed; iptables rules are left alone, so open
+#              connections (e.g. a long uv sync) are never interrupted
+#   --daemon   repeat --refresh whenever the earliest cached entry expires,
+#              at least every --interval seconds (default 300), to follow
+#              CDN IP rotation, e.g. `sudo init-firewall.sh --daemon &`
+#
+# The resolver comes only from FIREWALL_DNS_SERVER (an IPv4 literal) and
+# FIREWALL_DNS_PORT (1-65535), which sudo drops: a sudo caller always gets the
+# system resolver, and only root can pick another one. The sudoers rule allows
+# just the no-argument, --refresh and --daemon invocations.
+#
+# Sourcing this file only defines its functions (see tests/test_firewall.py);
+# executing it configures the firewall.
 
-echo "iptables version: $(iptables --version)"
-if iptables_path="$(command -v iptables 2>/dev/null)"; then
-    echo "iptables backend: $(readlink -f "$iptables_path")"
-else
-    echo "iptables backend: iptables not found"
-fi
+IPSET_NAME="allowed-domains"
+SETTINGS_DIR="/workspace/.claude"
+DNS_SERVER="${FIREWALL_DNS_SERVER:-}"
+DNS_PORT="${FIREWALL_DNS_PORT:-53}"
+DNS_JOBS="${FIREWALL_DNS_JOBS:-16}"
+CACHE_FILE="${FIREWALL_CACHE-/var/cache/init-firewall/allowlist}"
+CACHE_HEADER="# init-firewall allowlist cache v1"
+STALE_GRACE=300
+REFRESH_LOG="${FIREWALL_REFRESH_LOG:-/var/log/init-firewall-refresh.log}"
+LOCK_FILE="${FIREWALL_LOCK:-/run/init-firewall.lock}"
+MIN_REFRESH_INTERVAL="${FIREWALL_MIN_REFRESH_INTERVAL:-30}"
+GITHUB_META_SOURCE="api.github.com/meta"
+GITHUB_META_TTL=21600
+NEGATIVE_TTL=300
+ALLOWED_DOMAINS=(
+    "pypi.org"
+    "files.pythonhosted.org"
+    "astral.sh"
+    "claude.ai"
+    "api.anthropic.com"
+    "sentry.io"
+    "statsig.anthropic.com"
+    "statsig.com"
+    "marketplace.visualstudio.com"
+    "vscode.blob.core.windows.net"
+    "update.code.visualstudio.com"
+)
+IPV4_RE='^[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}$'
+CIDR_RE='^[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}/[0-9]{1,2}$'
 
-if ! iptables -L -n >/dev/null 2>&1; then
-    echo "ERROR: iptables not functional (missing kernel support or capabilities)"
-    echo "Skipping firewall setup - container will run without network restrictions"
-    exit 0
-fi
+# Fail unless DNS_SERVER is empty or an IPv4 literal and DNS_PORT is a port number.
+check_dns_settings() {
+    local octets octet
+    if [ -n "$DNS_SERVER" ]; then
+        IFS=. read -ra octets <<< "$DNS_SERVER"
+        for octet in "${octets[@]}"; do
+            if [[ ! "$DNS_SERVER" =~ $IPV4_RE ]] || ((10#$octet > 255)); then
+                echo "ERROR: Invalid DNS server (expected an IPv4 address): $DNS_SERVER" >&2
+                return 1
+            fi
+        done
+    fi
+    if [[ ! "$DNS_PORT" =~ ^[0-9]{1,5}$ ]] || ((10#$DNS_PORT < 1 || 10#$DNS_PORT > 65535)); then
+        echo "ERROR: Invalid DNS port (expected 1-65535): $DNS_PORT" >&2
+        return 1
+    fi
+}
 
-# 1. Extract Docker DNS info BEFORE any flushing
-DOCKER_DNS_RULES=$(iptables-save -t nat | grep "127\.0\.0\.11" || true)
-
-# Flush existing rules and delete existing ipsets
-iptables -F
-iptables -X 2>/dev/null || true
-iptables -t nat -F
-iptables -t nat -X 2>/dev/null || true
-iptables -t mangle -F
-iptables -t mangle -X 2>/dev/null || true
-ipset destroy allowed-domains 2>/dev/null || true
-
-# 2. Restore Docker DNS resolution
-if [ -n "$DOCKER_DNS_RULES" ]; then
-    echo "Restoring Docker DNS rules..."
-    iptables -t nat -N DOCKER_OUTPUT 2>/dev/null || true
-    iptables -t nat -N DOCKER_POSTROUTING 2>/dev/null || true
-    while IFS= read -r rule; do
-        [ -z "$rule" ] && continue
-        [[ "$rule" =~ ^# ]] && continue
-        # shellcheck disable=SC2086
-        iptables -t nat $rule || echo "WARNING: Failed to restore rule: $rule"
-    done <<< "$DOCKER_DNS_RULES"
-else
-    echo "No Docker DNS rules to restore"
-fi
+# Print the aggregated GitHub CIDR ranges, one per line; fails on a bad response.
+fetch_github_cidrs() {
+    local gh_ranges cidrs cidr
+    echo "Fetching GitHub IP ranges..." >&2
+    gh_ranges=$(curl -s --connect-timeout 10 --max-time 30 https://api.github.com/meta || true)
+    if [ -z "$gh_ranges" ]; then
+        echo "ERROR: Failed to fetch GitHub IP ranges" >&2
+        return 1
+    fi
 
-# Allow DNS and localhost before any restrictions
-iptables -A OUTPUT -p udp --dport 53 -j ACCEPT
-iptables -A INPUT -p udp --sport 53 -j ACCEPT
-iptables -A OUTPUT -p tcp --dport 53 -j ACCEPT
-iptables -A OUTPUT -p tcp --dport 22 -j ACCEPT
-iptables -A INPUT -p tcp --sport 22 -m state --state ESTABLISHED -j ACCEPT
-iptables -A INPUT -i lo -j ACCEPT
-iptables -A OUTPUT -o lo -j ACCEPT
-
-# Create ipset with CIDR support
-ipset create allowed-domains hash:net
-
-# --- GitHub IP ranges (aggregated) ---
-echo "Fetching GitHub IP ranges..."
-gh_ranges=$(curl -s --connect-timeout 10 --max-time 30 https://api.github.com/meta)
-if [ -z "$gh_ranges" ]; then
-    echo "ERROR: Failed to fetch GitHub IP ranges"
-    exit 1
-fi
+    if ! echo "$gh_ranges" | jq -e '.web and .api and .git' >/dev/null; then
+        echo "ERROR: GitHub API response missing required fields" >&2
+        return 1
+    fi
 
-if ! echo "$gh_ranges" | jq -e '.web and .api and .git' >/dev/null; then
-    echo "ERROR: GitHub API response missing required fields"
-    exit 1
-fi
+    echo "Processing GitHub IPs..." >&2
+    cidrs=$(echo "$gh_ranges" | jq -r '(.web + .api + .git)[]' | aggregate -q)
+    while read -r cidr; do
+        [ -z "$cidr" ] && continue
+        if [[ ! "$cidr" =~ $CIDR_RE ]]; then
+            echo "ERROR: Invalid CIDR range from GitHub meta: $cidr" >&2
+            return 1
+        fi
+        echo "$cidr"
+    done <<< "$cidrs"
+}
 
-echo "Processing GitHub IPs..."
-while read -r cidr; do
-    if [[ ! "$cidr" =~ ^[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}/[0-9]{1,2}$ ]]; then
-        echo "ERROR: Invalid CIDR range from GitHub meta: $cidr"
-        exit 1
+# Print allowlist records "<domain> <expires> <ip>" for the IPv4 A records of a
+# domain, skipping invalid answers. A domain without valid answers gets a
+# negative record "<domain> <expires> -" so it is not retried on every restart.
+resolve_records() {
+    local domain="$1" opts=(+time=2 +tries=2) answers ip ttl now found=false
+    [ -n "$DNS_SERVER" ] && opts+=("@$DNS_SERVER" -p "$DNS_PORT")
+    now=$(date +%s)
+    answers=$(dig "${opts[@]}" +noall +answer A "$domain" | awk '$4 == "A" {print $5, $2}' || true)
+    if [ -z "$answers" ]; then
+        echo "WARNING: Failed to resolve $domain (skipping)" >&2
     fi
-    ipset add allowed-domains "$cidr"
-done < <(echo "$gh_ranges" | jq -r '(.web + .api + .git)[]' | aggregate -q)
-
-# --- Resolve and add individual domains ---
-for domain in \
-    "pypi.org" \
-    "files.pythonhosted.org" \
-    "astral.sh" \
-    "claude.ai" \
-    "api.anthropic.com" \
-    "sentry.io" \
-    "statsig.anthropic.com" \
-    "statsig.com" \
-    "marketplace.visualstudio.com" \
-    "vscode.blob.core.windows.net" \
-    "update.code.visualstudio.com"; do
-    echo "Resolving $domain..."
-    ips=$(dig +noall +answer A "$domain" | awk '$4 == "A" {print $5}')
-    if [ -z "$ips" ]; then
-        echo "WARNING: Failed to resolve $domain (skipping)"
-        continue
-    fi
-
-    while read -r ip; do
-        if [[ ! "$ip" =~ ^[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}$ ]]; then
-            echo "WARNING: Invalid IP from DNS for $domain: $ip (skipping)"
+
+    while IFS=' ' read -r ip ttl; do
+        [ -z "$ip" ] && continue
+        if [[ ! "$ip" =~ $IPV4_RE ]]; then
+            echo "WARNING: Invalid IP from DNS for $domain: $ip (skipping)" >&2
             continue
         fi
-        ipset add allowed-domains "$ip" 2>/dev/null || true
-    done < <(echo "$ips")
-done
+        [[ "$ttl" =~ ^[0-9]+$ ]] || ttl=0
+        echo "$domain $((now + ttl)) $ip"
+        found=true
+    done <<< "$answers"
+    $found || echo "$domain $((now + NEGATIVE_TTL)) -"
+}
+
+# Print the IPv4 A records of a domain, one per line, skipping invalid answers.
+resolve_domain() {
+    resolve_records "$1" | awk '$3 != "-" {print $3}'
+}
+
+# Print the records of every domain given, resolving up to DNS_JOBS at a time;
+# output keeps the order of the arguments.
+resolve_parallel() {
+    local tmp domain i=0 running=0
+    [ $# -eq 0 ] && return 0
+    tmp=$(mktemp -d)
+    for domain in "$@"; do
+        if [ "$running" -ge "$DNS_JOBS" ]; then
+            wait -n || true
+            running=$((running - 1))
+        fi
+        resolve_records "$domain" > "$tmp/$i" &
+        i=$((i + 1))
+        running=$((running + 1))
+    done
+    wait
+    for ((i = 0; i < $#; i++)); do
+        cat "$tmp/$i"
+    done
+    rm -rf "$tmp"
+}
 
 # --- Extract domains from WebFetch permission settings ---
 extract_webfetch_domains() {
@@ -122,87 +171,328 @@ extract_webfetch_domains() {
     ' "$file" 2>/dev/null || true
 }
 
-SETTINGS_DIR="/workspace/.claude"
-WEBFETCH_DOMAINS=""
-for settings_file in "$SETTINGS_DIR/settings.json" "$SETTINGS_DIR/settings.local.json"; do
-    if [ -f "$settings_file" ]; then
-        echo "Scanning $settings_file for WebFetch domains..."
-        WEBFETCH_DOMAINS="$WEBFETCH_DOMAINS $(extract_webfetch_domains "$settings_file")"
-    fi
-done
+# Print the unique WebFetch domains from settings.json and settings.local.json.
+collect_webfetch_domains() {
+    local settings_file domains=""
+    for settings_file in "$SETTINGS_DIR/settings.json" "$SETTINGS_DIR/settings.local.json"; do
+        if [ -f "$settings_file" ]; then
+            echo "Scanning $settings_file for WebFetch domains..." >&2
+            domains="$domains $(extract_webfetch_domains "$settings_file")"
+        fi
+    done
+    printf '%s\n' "$domains" | tr ' ' '\n' | sed '/^$/d' | sort -u
+}
 
-UNIQUE_DOMAINS=$(printf '%s\n' "$WEBFETCH_DOMAINS" | tr ' ' '\n' | sed '/^$/d' | sort -u)
-if [ -n "$UNIQUE_DOMAINS" ]; then
+# Print the domains to allow: the fixed list, then resolvable WebFetch domains.
+allowlist_domains() {
+    local domain
+    printf '%s\n' "${ALLOWED_DOMAINS[@]}"
     while read -r domain; do
+        [ -z "$domain" ] && continue
         if [[ "$domain" == \** ]]; then
-            echo "WARNING: Wildcard domain '$domain' cannot be resolved to IPs (skipping)"
+            echo "WARNING: Wildcard domain '$domain' cannot be resolved to IPs (skipping)" >&2
             continue
         fi
-        echo "Resolving WebFetch domain: $domain..."
-        ips=$(dig +noall +answer A "$domain" | awk '$4 == "A" {print $5}')
-        if [ -z "$ips" ]; then
-            echo "WARNING: Failed to resolve $domain (skipping)"
-            continue
+        echo "$domain"
+    done <<< "$(collect_webfetch_domains)"
+}
+
+# Print the cached records, or nothing if the cache is disabled, missing or invalid.
+read_cache() {
+    [ -n "$CACHE_FILE" ] && [ -f "$CACHE_FILE" ] || return 0
+    awk -v header="$CACHE_HEADER" '
+        NR == 1 && $0 != header { exit }
+        NR > 1 && NF == 3 && $2 ~ /^[0-9]+$/ && $3 ~ /^([0-9.]+(\/[0-9]+)?|-)$/
+    ' "$CACHE_FILE"
+}
+
+# Replace the cache with the records on stdin.
+write_cache() {
+    [ -n "$CACHE_FILE" ] || return 0
+    local tmp
+    mkdir -p "$(dirname "$CACHE_FILE")"
+    tmp=$(mktemp "$CACHE_FILE.XXXXXX")
+    { echo "$CACHE_HEADER"; awk 'NF == 3'; } > "$tmp"
+    mv "$tmp" "$CACHE_FILE"
+}
+
+# Print the allowlist records "<source> <expires> <entry>" for GitHub and every
+# allowed domain. Cached records expiring at or after CUTOFF (default: STALE_GRACE
+# seconds ago) are reused; everything else is fetched or resolved in parallel.
+collect_records() {
+    local cutoff="${1:-$(($(date +%s) - STALE_GRACE))}" cached github domain domain_records missing=()
+    cached=$(read_cache | awk -v cutoff="$cutoff" '$2 >= cutoff')
+
+    github=$(awk -v src="$GITHUB_META_SOURCE" '$1 == src' <<< "$cached")
+    if [ -z "$github" ]; then
+        github=$(fetch_github_cidrs | awk -v src="$GITHUB_META_SOURCE" -v expires=$(($(date +%s) + GITHUB_META_TTL)) \
+            '{print src, expires, $0}') || return 1
+    fi
+    echo "$github"
+
+    while read -r domain; do
+        domain_records=$(awk -v d="$domain" '$1 == d' <<< "$cached")
+        if [ -n "$domain_records" ]; then
+            echo "$domain_records"
+        else
+            missing+=("$domain")
         fi
-        while read -r ip; do
-            if [[ ! "$ip" =~ ^[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}$ ]]; then
-                echo "WARNING: Invalid IP from DNS for $domain: $ip (skipping)"
-                continue
-            fi
-            ipset add allowed-domains "$ip" 2>/dev/null || true
-        done < <(echo "$ips")
-    done <<< "$UNIQUE_DOMAINS"
-fi
+    done <<< "$(allowlist_domains | awk '!seen[$0]++')"
 
-# --- Host network detection ---
-HOST_IP=$(ip route | grep default | cut -d" " -f3)
-if [ -z "$HOST_IP" ]; then
-    echo "ERROR: Failed to detect host IP"
-    exit 1
-fi
+    if [ ${#missing[@]} -gt 0 ]; then
+        echo "Resolving ${#missing[@]} domains (${DNS_JOBS} at a time)..." >&2
+        resolve_parallel "${missing[@]}"
+    fi
+}
 
-HOST_NETWORK=$(echo "$HOST_IP" | sed "s/\.[0-9]*$/.0\/24/")
-echo "Host network detected as: $HOST_NETWORK"
+# Print every allowlist entry: GitHub CIDRs, fixed domain IPs, then WebFetch domain IPs.
+collect_allowlist() {
+    collect_records "$@" | awk '$3 != "-" {print $3}'
+}
 
-iptables -A INPUT -s "$HOST_NETWORK" -j ACCEPT
-iptables -A OUTPUT -d "$HOST_NETWORK" -j ACCEPT
+# Print the unique ipset entries of the records on stdin.
+record_entries() {
+    awk '$3 != "-" {print $3}' | sort -u
+}
 
-# Block all IPv6 traffic (firewall is IPv4-only)
-ip6tables -P INPUT DROP 2>/dev/null || true
-ip6tables -P FORWARD DROP 2>/dev/null || true
-ip6tables -P OUTPUT DROP 2>/dev/null || true
-ip6tables -A INPUT -i lo -j ACCEPT 2>/dev/null || true
-ip6tables -A OUTPUT -o lo -j ACCEPT 2>/dev/null || true
+# Print an `ipset restore` batch that recreates SET from the entries on stdin.
+ipset_restore_batch() {
+    local set="$1" entry
+    echo "create $set hash:net family inet"
+    echo "flush $set"
+    while read -r entry; do
+        if [ -n "$entry" ]; then
+            echo "add $set $entry"
+        fi
+    done
+}
 
-# Allow established connections
-iptables -A INPUT -m state --state ESTABLISHED,RELATED -j ACCEPT
-iptables -A OUTPUT -m state --state ESTABLISHED,RELATED -j ACCEPT
+# Replace SET with the entries on stdin: one `ipset restore` fills a temporary
+# set, which is swapped in atomically (or renamed if SET does not exist yet).
+load_allowlist() {
+    local set="$1" tmp="$1-new"
+    ipset_restore_batch "$tmp" | ipset -exist restore
+    if ipset list -name "$set" >/dev/null 2>&1; then
+        ipset swap "$tmp" "$set"
+        ipset destroy "$tmp"
+    else
+        ipset rename "$tmp" "$set"
+    fi
+}
+
+# Run a command holding the allowlist lock, so setup and refreshes never overlap.
+with_lock() {
+    (
+        flock 9
+        "$@"
+    ) 9> "$LOCK_FILE"
+}
 
-# Allow traffic to whitelisted domains
-iptables -A OUTPUT -m set --match-set allowed-domains dst -j ACCEPT
+# Print the members of a live ipset, sorted; single addresses drop their /32.
+live_entries() {
+    ipset list "$1" | awk 'members && NF {print $1} /^Members:/ {members = 1}' | sed 's|/32$||' | LC_ALL=C sort -u
+}
+
+# Swap the entries on stdin into SET only if they differ from its live members.
+apply_allowlist_diff() {
+    local set="$1" desired live added removed
+    desired=$(sed '/^$/d; s|/32$||' | LC_ALL=C sort -u)
+    live=$(live_entries "$set")
+    added=$(LC_ALL=C comm -13 <(echo "$live") <(echo "$desired") | sed '/^$/d' | wc -l)
+    removed=$(LC_ALL=C comm -23 <(echo "$live") <(echo "$desired") | sed '/^$/d' | wc -l)
+    if [ "$added" -eq 0 ] && [ "$removed" -eq 0 ]; then
+        echo "$set is up to date ($(sed '/^$/d' <<< "$desired" | wc -l) entries)"
+        return 0
+    fi
+    load_allowlist "$set" <<< "$desired"
+    echo "Updated $set: $added added, $removed removed"
+}
 
-# Reject all other outbound traffic (immediate feedback)
-iptables -A OUTPUT -j REJECT --reject-with icmp-admin-prohibited
+# Re-resolve expired records, rewrite the cache and swap the changes into the live ipset.
+refresh_allowlist() {
+    local records
+    if ! ipset list -name "$IPSET_NAME" >/dev/null 2>&1; then
+        echo "ERROR: ipset $IPSET_NAME does not exist; run init-firewall.sh without --refresh first" >&2
+        return 1
+    fi
+    echo "$(date -Is) Refreshing expired allowlist entries"
+    records=$(collect_records "$(date +%s)") || return 1
+    write_cache <<< "$records"
+    record_entries <<< "$records" | apply_allowlist_diff "$IPSET_NAME"
+}
 
-# Set default policies AFTER all ACCEPT rules (prevents lockout on partial failure)
-iptables -P INPUT DROP
-iptables -P FORWARD DROP
-iptables -P OUTPUT DROP
+# Print the seconds until the earliest cached record expires, clamped to
+# [MIN_REFRESH_INTERVAL, MAX].
+next_refresh_delay() {
+    read_cache | awk -v now="$(date +%s)" -v min="$MIN_REFRESH_INTERVAL" -v max="$1" '
+        NR == 1 || $2 < first { first = $2 }
+        END {
+            delay = NR ? first - now : max
+            print (delay < min ? min : (delay > max ? max : delay))
+        }'
+}
 
-echo "Firewall configuration complete"
+# Refresh the allowlist forever, waking up when the earliest cached record expires.
+run_daemon() {
+    local interval="$1"
+    echo "$(date -Is) Refreshing $IPSET_NAME at least every ${interval}s"
+    while true; do
+        with_lock refresh_allowlist || echo "WARNING: Refresh failed; keeping the current allowlist" >&2
+        sleep "$(next_refresh_delay "$interval")"
+    done
+}
 
-# --- Verification ---
-echo "Verifying firewall rules..."
-if curl --connect-timeout 5 https://example.com >/dev/null 2>&1; then
-    echo "ERROR: Firewall verification failed - was able to reach https://example.com"
-    exit 1
-else
-    echo "PASS: example.com blocked as expected"
-fi
+main() {
+    local mode="setup" interval=300
+    while [[ $# -gt 0 ]]; do
+        case "$1" in
+            --refresh)  mode="refresh"; shift ;;
+            --daemon)   mode="daemon";  shift ;;
+            --interval) interval="${2:-}"; shift $(($# > 1 ? 2 : 1)) ;;
+            *)
+                echo "Unknown argument: $1" >&2
+                exit 1
+                ;;
+        esac
+    done
+    if [[ ! "$interval" =~ ^[0-9]{1,6}$ ]] || ((10#$interval < 1)); then
+        echo "ERROR: Invalid --interval (expected a positive number of seconds): $interval" >&2
+        exit 1
+    fi
+    check_dns_settings || exit 1
+
+    case "$mode" in
+        refresh)
+            with_lock refresh_allowlist
+            exit
+            ;;
+        daemon)
+            run_daemon "$interval"
+            ;;
+    esac
+
+    echo "iptables version: $(iptables --version)"
+    if iptables_path="$(command -v iptables 2>/dev/null)"; then
+        echo "iptables backend: $(readlink -f "$iptables_path")"
+    else
+        echo "iptables backend: iptables not found"
+    fi
+
+    if ! iptables -L -n >/dev/null 2>&1; then
+        echo "ERROR: iptables not functional (missing kernel support or capabilities)"
+        echo "Skipping firewall setup - container will run without network restrictions"
+        exit 0
+    fi
+
+    # 1. Extract Docker DNS info BEFORE any flushing
+    DOCKER_DNS_RULES=$(iptables-save -t nat | grep "127\.0\.0\.11" || true)
+
+    # Flush existing rules and delete existing ipsets
+    iptables -F
+    iptables -X 2>/dev/null || true
+    iptables -t nat -F
+    iptables -t nat -X 2>/dev/null || true
+    iptables -t mangle -F
+    iptables -t mangle -X 2>/dev/null || true
+
+    # 2. Restore Docker DNS resolution
+    if [ -n "$DOCKER_DNS_RULES" ]; then
+        echo "Restoring Docker DNS rules..."
+        iptables -t nat -N DOCKER_OUTPUT 2>/dev/null || true
+        iptables -t nat -N DOCKER_POSTROUTING 2>/dev/null || true
+        while IFS= read -r rule; do
+            [ -z "$rule" ] && continue
+            [[ "$rule" =~ ^# ]] && continue
+            # shellcheck disable=SC2086
+            iptables -t nat $rule || echo "WARNING: Failed to restore rule: $rule"
+        done <<< "$DOCKER_DNS_RULES"
+    else
+        echo "No Docker DNS rules to restore"
+    fi
+
+    # Allow DNS and localhost before any restrictions
+    iptables -A OUTPUT -p udp --dport 53 -j ACCEPT
+    iptables -A INPUT -p udp --sport 53 -j ACCEPT
+    iptables -A OUTPUT -p tcp --dport 53 -j ACCEPT
+    iptables -A OUTPUT -p tcp --dport 22 -j ACCEPT
+    iptables -A INPUT -p tcp --sport 22 -m state --state ESTABLISHED -j ACCEPT
+    iptables -A INPUT -i lo -j ACCEPT
+    iptables -A OUTPUT -o lo -j ACCEPT
+    # The resolver was validated above and can only be set by root (see the header)
+    if [ -n "$DNS_SERVER" ] && [ "$DNS_PORT" != "53" ]; then
+        iptables -A OUTPUT -p udp -d "$DNS_SERVER" --dport "$DNS_PORT" -j ACCEPT
+        iptables -A OUTPUT -p tcp -d "$DNS_SERVER" --dport "$DNS_PORT" -j ACCEPT
+    fi
+
+    # Load the allowlist: GitHub CIDRs, fixed domains and WebFetch domains
+    echo "Building allowlist${CACHE_FILE:+ (cache: $CACHE_FILE)}..."
+    RECORDS=$(collect_records) || exit 1
+    write_cache <<< "$RECORDS"
+    ALLOWLIST=$(record_entries <<< "$RECORDS")
+    with_lock load_allowlist "$IPSET_NAME" <<< "$ALLOWLIST"
+    echo "Loaded $(wc -l <<< "$ALLOWLIST") entries into $IPSET_NAME"
+
+    # --- Host network detection ---
+    HOST_IP=$(ip route | grep default | cut -d" " -f3)
+    if [ -z "$HOST_IP" ]; then
+        echo "ERROR: Failed to detect host IP"
+        exit 1
+    fi
+
+    HOST_NETWORK=$(echo "$HOST_IP" | sed "s/\.[0-9]*$/.0\/24/")
+    echo "Host network detected as: $HOST_NETWORK"
+
+    iptables -A INPUT -s "$HOST_NETWORK" -j ACCEPT
+    iptables -A OUTPUT -d "$HOST_NETWORK" -j ACCEPT
+
+    # Block all IPv6 traffic (firewall is IPv4-only)
+    ip6tables -P INPUT DROP 2>/dev/null || true
+    ip6tables -P FORWARD DROP 2>/dev/null || true
+    ip6tables -P OUTPUT DROP 2>/dev/null || true
+    ip6tables -A INPUT -i lo -j ACCEPT 2>/dev/null || true
+    ip6tables -A OUTPUT -o lo -j ACCEPT 2>/dev/null || true
+
+    # Allow established connections
+    iptables -A INPUT -m state --state ESTABLISHED,RELATED -j ACCEPT
+    iptables -A OUTPUT -m state --state ESTABLISHED,RELATED -j ACCEPT
+
+    # Allow traffic to whitelisted domains
+    iptables -A OUTPUT -m set --match-set "$IPSET_NAME" dst -j ACCEPT
+
+    # Reject all other outbound traffic (immediate feedback)
+    iptables -A OUTPUT -j REJECT --reject-with icmp-admin-prohibited
+
+    # Set default policies AFTER all ACCEPT rules (prevents lockout on partial failure)
+    iptables -P INPUT DROP
+    iptables -P FORWARD DROP
+    iptables -P OUTPUT DROP
+
+    echo "Firewall configuration complete"
+
+    # --- Verification ---
+    echo "Verifying firewall rules..."
+    if curl --connect-timeout 5 https://example.com >/dev/null 2>&1; then
+        echo "ERROR: Firewall verification failed - was able to reach https://example.com"
+        exit 1
+    else
+        echo "PASS: example.com blocked as expected"
+    fi
+
+    if ! curl --connect-timeout 5 https://api.github.com/zen >/dev/null 2>&1; then
+        echo "ERROR: Firewall verification failed - unable to reach https://api.github.com"
+        exit 1
+    else
+        echo "PASS: api.github.com reachable as expected"
+    fi
+
+    # Stale cached entries were used to start quickly; re-resolve them off the critical path
+    if awk -v now="$(date +%s)" '$2 < now {stale = 1} END {exit !stale}' <<< "$RECORDS"; then
+        echo "Refreshing expired allowlist entries in the background (log: $REFRESH_LOG)"
+        with_lock refresh_allowlist < /dev/null >> "$REFRESH_LOG" 2>&1 &
+        disown
+    fi
+}
 
-if ! curl --connect-timeout 5 https://api.github.com/zen >/dev/null 2>&1; then
-    echo "ERROR: Firewall verification failed - unable to reach https://api.github.com"
-    exit 1
-else
-    echo "PASS: api.github.com reachable as expected"
+if [[ "${BASH_SOURCE[0]}" == "$0" ]]; then
+    main "$@"
 fi
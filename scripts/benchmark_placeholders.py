@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Benchmark single-pass placeholder substitution against the per-placeholder loop.
+
+Generates a synthetic template in a temporary directory and times both strategies
+over it, in memory and end-to-end through the filesystem.
+
+Usage:
+    python scripts/benchmark_placeholders.py
+    python scripts/benchmark_placeholders.py --files 2000 --size 65536 --density 0.2
+"""
+
+import argparse
+import importlib.util
+import random
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+_spec = importlib.util.spec_from_file_location("setup_project", ROOT / "setup_project.py")
+assert _spec and _spec.loader
+setup_project = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(setup_project)
+
+# Keys are assembled at runtime so rendering the template does not substitute them
+REPLACEMENTS = {
+    "{{" + name + "}}": value
+    for name, value in {
+        "project_name": "bench-project",
+        "namespace": "bench_project",
+        "description": "A benchmark project",
+        "author_name": "Bench Author",
+        "author_email": "bench@example.com",
+        "python_version": "3.11",
+        "base_branch": "main",
+        "year": "2026",
+    }.items()
+}
+
+
+def legacy_replace_in_file(filepath: Path, replacements: dict[str, str]) -> bool:
+    """Reference implementation: one full ``str.replace`` pass per placeholder."""
+    try:
+        content = filepath.read_text(encoding="utf-8")
+    except (UnicodeDecodeError, PermissionError):
+        return False
+
+    original = content
+    for placeholder, value in replacements.items():
+        content = content.replace(placeholder, value)
+
+    if content != original:
+        filepath.write_text(content, encoding="utf-8")
+        return True
+    return False
+
+
+def make_content(size: int, density: float, rng: random.Random) -> str:
+    """Build roughly ``size`` characters of text where ``density`` of the lines carry a placeholder."""
+    placeholders = list(REPLACEMENTS)
+    lines = []
+    total = 0
+    while total < size:
+        if rng.random() < density:
+            line = f"value = {rng.choice(placeholders)}  # templated line\n"
+        else:
+            line = "x = 'static text with no substitution at all'\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def make_template(root: Path, files: int, size: int, density: float, seed: int) -> list[Path]:
+    """Write ``files`` synthetic text files below ``root``; half of them contain no placeholders."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        path = root / f"dir{i % 16}" / f"file{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(make_content(size, density if i % 2 == 0 else 0.0, rng), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def time_call(func, repeat: int) -> float:
+    """Return the best wall time of ``repeat`` runs of ``func``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark placeholder substitution strategies")
+    parser.add_argument("--files", type=int, default=500, help="Number of synthetic files (default: 500)")
+    parser.add_argument("--size", type=int, default=16384, help="Approximate file size in bytes (default: 16384)")
+    parser.add_argument("--density", type=float, default=0.1, help="Fraction of lines with a placeholder")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement (best is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for content generation")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    content = make_content(args.size * 64, args.density, rng)
+    pattern = setup_project.compile_placeholders(REPLACEMENTS)
+
+    def legacy_text() -> None:
+        result = content
+        for placeholder, value in REPLACEMENTS.items():
+            result = result.replace(placeholder, value)
+
+    def single_pass_text() -> None:
+        setup_project.substitute(content, REPLACEMENTS, pattern)
+
+    print(f"In-memory substitution ({len(content)} chars, density {args.density}):")
+    legacy = time_call(legacy_text, args.repeat)
+    single = time_call(single_pass_text, args.repeat)
+    print(f"  per-placeholder loop: {legacy * 1000:8.2f} ms")
+    print(f"  single pass:          {single * 1000:8.2f} ms  ({legacy / single:.2f}x)")
+
+    print(f"\nFile substitution ({args.files} files of ~{args.size} bytes, half without placeholders):")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, func in [
+            ("per-placeholder loop", lambda p: legacy_replace_in_file(p, REPLACEMENTS)),
+            ("single pass", lambda p: setup_project.replace_in_file(p, REPLACEMENTS, pattern)),
+        ]:
+            best = float("inf")
+            for run in range(args.repeat):
+                # Regenerate the tree each run so every run substitutes the same content
+                paths = make_template(Path(tmp) / f"{len(results)}-{run}", args.files, args.size, args.density, args.seed)
+                start = time.perf_counter()
+                for path in paths:
+                    func(path)
+                best = min(best, time.perf_counter() - start)
+            results[name] = best
+        legacy, single = results["per-placeholder loop"], results["single pass"]
+        print(f"  per-placeholder loop: {legacy * 1000:8.2f} ms")
+        print(f"  single pass:          {single * 1000:8.2f} ms  ({legacy / single:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark Postgres throughput of the devcontainer service profiles with pgbench.
+
+Writes each profile's docker-compose.yml to a temporary directory, starts only its
+``db`` service, loads a pgbench dataset and reports transactions per second against
+the first (stock) profile. Requires Docker with the compose plugin.
+
+Usage:
+    python scripts/benchmark_services.py
+    python scripts/benchmark_services.py --profiles postgres postgres-fast --clients 16 --seconds 30
+"""
+
+import argparse
+import importlib.util
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+_spec = importlib.util.spec_from_file_location("setup_project", ROOT / "setup_project.py")
+assert _spec and _spec.loader
+setup_project = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(setup_project)
+
+DATABASE = "bench"
+# Keys are assembled at runtime so rendering the template does not substitute them
+REPLACEMENTS = {"{{" + "namespace" + "}}": DATABASE}
+TPS_PATTERN = re.compile(r"^tps = ([\d.]+)", re.MULTILINE)
+
+
+def compose(compose_file: Path, project: str, *args: str, capture: bool = False) -> str:
+    """Run ``docker compose`` for one benchmark project and return its output when captured."""
+    result = subprocess.run(
+        ["docker", "compose", "-f", str(compose_file), "-p", project, *args],
+        check=True,
+        capture_output=capture,
+        text=True,
+    )
+    return result.stdout or ""
+
+
+def measure_profile(profile: str, workdir: Path, args: argparse.Namespace) -> float:
+    """Start ``profile``'s database, run pgbench against it and return the measured TPS."""
+    compose_file = workdir / profile / "docker-compose.yml"
+    compose_file.parent.mkdir(parents=True)
+    compose_file.write_text(setup_project.substitute(setup_project.COMPOSE_TEMPLATES[profile], REPLACEMENTS))
+    project = f"bench-{profile}"
+    pgbench = ["exec", "-T", "db", "pgbench", "-U", DATABASE]
+    try:
+        compose(compose_file, project, "up", "--detach", "--wait", "db")
+        compose(compose_file, project, *pgbench, "--initialize", "--quiet", f"--scale={args.scale}", DATABASE)
+        output = compose(
+            compose_file,
+            project,
+            *pgbench,
+            f"--client={args.clients}",
+            f"--jobs={args.jobs}",
+            f"--time={args.seconds}",
+            DATABASE,
+            capture=True,
+        )
+    finally:
+        compose(compose_file, project, "down", "--volumes", "--timeout", "1")
+    match = TPS_PATTERN.search(output)
+    if match is None:
+        raise RuntimeError(f"pgbench printed no tps for {profile}:\n{output}")
+    return float(match.group(1))
+
+
+def main() -> None:
+    postgres_profiles = [name for name in setup_project.COMPOSE_TEMPLATES if name.startswith("postgres")]
+    parser = argparse.ArgumentParser(description="Benchmark devcontainer Postgres service profiles")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=postgres_profiles,
+        default=["postgres", "postgres-fast"],
+        help="Profiles to compare; the first one is the baseline (default: postgres postgres-fast)",
+    )
+    parser.add_argument("--scale", type=int, default=10, help="pgbench scale factor (default: 10)")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent pgbench clients (default: 8)")
+    parser.add_argument("--jobs", type=int, default=4, help="pgbench worker threads (default: 4)")
+    parser.add_argument("--seconds", type=int, default=20, help="Duration of each run (default: 20)")
+    args = parser.parse_args()
+
+    print(f"pgbench TPC-B ({args.clients} clients, {args.jobs} jobs, scale {args.scale}, {args.seconds}s):")
+    results: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles:
+            try:
+                results[profile] = measure_profile(profile, Path(tmp), args)
+            except (OSError, subprocess.CalledProcessError, RuntimeError) as exc:
+                sys.exit(f"Benchmark of {profile} failed: {exc}")
+            baseline = results[args.profiles[0]]
+            print(f"  {profile:<22} {results[profile]:10.1f} tps  ({results[profile] / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env bash
+# Build the devcontainer image with BuildKit and report how long it took.
+#
+# Mirror files hold one NAME=VALUE build argument per line (blank lines and
+# # comments are ignored), for example:
+#
+#   PYTHON_IMAGE=registry.local:5000/library/python:3.11-bookworm
+#   UV_IMAGE=registry.local:5000/astral-sh/uv:latest
+#   APT_MIRROR=http://host.docker.internal:3142/deb.debian.org
+#   GITHUB_DOWNLOAD_URL=http://host.docker.internal:8080/github
+#   CLAUDE_INSTALL_URL=http://host.docker.internal:8080/claude/install.sh
+#
+# Usage:
+#   scripts/build_devcontainer.sh                              # warm build, default sources
+#   scripts/build_devcontainer.sh --cold                       # ignore layer and download caches
+#   scripts/build_devcontainer.sh --cold --mirror mirror.env --network host   # time a build from local mirrors
+#   scripts/build_devcontainer.sh --network none               # check a warm rebuild needs no network
+
+set -euo pipefail
+
+# ---------------------------------------------------------------------------
+# Argument parsing
+# ---------------------------------------------------------------------------
+CONTEXT="$(cd "$(dirname "$0")/../.devcontainer" && pwd)"
+TAG="devcontainer:local"
+TARGET="project"
+MIRROR=""
+NETWORK=""
+COLD=false
+
+while [[ $# -gt 0 ]]; do
+    case "$1" in
+        --tag)      TAG="$2";      shift 2 ;;
+        --target)   TARGET="$2";   shift 2 ;;
+        --mirror)   MIRROR="$2";   shift 2 ;;
+        --network)  NETWORK="$2";  shift 2 ;;
+        --cold)     COLD=true;     shift ;;
+        --help|-h)
+            echo "Usage: $0 [--tag TAG] [--target base|project] [--mirror FILE] [--network MODE] [--cold]"
+            exit 0
+            ;;
+        *)
+            echo "Unknown argument: $1" >&2
+            exit 1
+            ;;
+    esac
+done
+
+BUILD_ARGS=(--tag "$TAG" --target "$TARGET")
+if [[ -n "$MIRROR" ]]; then
+    [[ -f "$MIRROR" ]] || { echo "ERROR: mirror file '$MIRROR' not found" >&2; exit 1; }
+    while IFS= read -r line || [[ -n "$line" ]]; do
+        [[ -z "${line//[[:space:]]/}" || "$line" == \#* ]] && continue
+        BUILD_ARGS+=(--build-arg "$line")
+    done < "$MIRROR"
+fi
+# --network applies to RUN steps: "host" reaches mirrors on localhost, "none" fails
+# any step that is not served from the layer cache.
+[[ -n "$NETWORK" ]] && BUILD_ARGS+=(--network "$NETWORK")
+$COLD && BUILD_ARGS+=(--no-cache)
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+echo "=== Devcontainer build: $TAG (target $TARGET${MIRROR:+, mirror $MIRROR}${NETWORK:+, network $NETWORK}) ==="
+if $COLD; then
+    # --no-cache still reuses BuildKit cache mounts, so drop them to force re-downloads.
+    # This clears the apt and download caches of every build on this builder.
+    docker builder prune --force --filter type=exec.cachemount >/dev/null
+fi
+START=$(date +%s%N)
+DOCKER_BUILDKIT=1 docker build "${BUILD_ARGS[@]}" "$CONTEXT"
+ELAPSED_MS=$(( ($(date +%s%N) - START) / 1000000 ))
+printf "Built %s in %d.%03ds\n" "$TAG" $((ELAPSED_MS / 1000)) $((ELAPSED_MS % 1000))
@@ -29,7 +29,7 @@ while [[ $# -gt 0 ]]; do
         --packages)    PACKAGES="$2";    shift 2 ;;
         --services)    SERVICES="$2";    shift 2 ;;
         --help|-h)
-            echo "Usage: $0 --source-dir DIR --work-dir DIR [--project-type mono|single] [--packages LIST] [--services none|postgres|postgres-redis|custom]"
+            echo "Usage: $0 --source-dir DIR --work-dir DIR [--project-type mono|single] [--packages LIST] [--services none|postgres|postgres-redis|postgres-fast|postgres-redis-fast|postgres-pgbouncer|custom]"
             exit 0
             ;;
         *)
@@ -70,37 +70,19 @@ echo "  work:   $WORK_DIR"
 echo ""
 
 # ---------------------------------------------------------------------------
-# Step 1: Copy template to work directory
+# Step 1: Prepare work directory
 # ---------------------------------------------------------------------------
-echo "Step 1: Copy template to work directory"
+echo "Step 1: Prepare work directory"
 rm -rf "$WORK_DIR"
-mkdir -p "$WORK_DIR"
-
-# Use rsync if available, otherwise fall back to cp + cleanup
-if command -v rsync > /dev/null 2>&1; then
-    rsync -a \
-        --exclude='.git' \
-        --exclude='.venv' \
-        --exclude='__pycache__' \
-        --exclude='.coverage' \
-        --exclude='.ruff_cache' \
-        --exclude='.pytest_cache' \
-        --exclude='node_modules' \
-        "$SOURCE_DIR/" "$WORK_DIR/"
-else
-    cp -a "$SOURCE_DIR/." "$WORK_DIR/"
-    rm -rf "$WORK_DIR/.git" "$WORK_DIR/.venv" "$WORK_DIR/node_modules"
-    find "$WORK_DIR" -type d -name '__pycache__' -exec rm -rf {} + 2>/dev/null || true
-    find "$WORK_DIR" -type d -name '.ruff_cache' -exec rm -rf {} + 2>/dev/null || true
-    find "$WORK_DIR" -type d -name '.pytest_cache' -exec rm -rf {} + 2>/dev/null || true
-fi
-step_pass "Copied template"
+step_pass "Work directory cleared"
 
 # ---------------------------------------------------------------------------
 # Step 2: Apply template
 # ---------------------------------------------------------------------------
-echo "Step 2: Apply template (setup_project.py)"
-python "$WORK_DIR/setup_project.py" \
+# Render straight from the pristine template into the work directory. Paths
+# setup_project.py skips (.git, .venv, caches) are never read or copied.
+echo "Step 2: Apply template (setup_project.py --output)"
+python "$SOURCE_DIR/setup_project.py" \
     --name test-project \
     --namespace test_project \
     --description "CI integration test" \
@@ -111,6 +93,7 @@ python "$WORK_DIR/setup_project.py" \
     --type "$PROJECT_TYPE" \
     --packages "$PACKAGES" \
     --services "$SERVICES" \
+    --output "$WORK_DIR" \
     --keep-setup \
 || step_fail "setup_project.py exited with non-zero status"
 step_pass "Template applied"
@@ -228,17 +211,34 @@ if [[ "$SERVICES" != "none" ]]; then
         || step_fail "$COMPOSE_FILE missing 'services:' key"
     # Verify the requested service is actually defined (db for postgres profiles).
     case "$SERVICES" in
-        postgres)
+        postgres|postgres-fast)
+            grep -q '  db:' "$COMPOSE_FILE" \
+                || step_fail "$COMPOSE_FILE missing 'db' service for --services $SERVICES"
+            ;;
+        postgres-pgbouncer)
             grep -q '  db:' "$COMPOSE_FILE" \
-                || step_fail "$COMPOSE_FILE missing 'db' service for --services postgres"
+                || step_fail "$COMPOSE_FILE missing 'db' service for --services $SERVICES"
+            grep -q '  pgbouncer:' "$COMPOSE_FILE" \
+                || step_fail "$COMPOSE_FILE missing 'pgbouncer' service for --services $SERVICES"
+            grep -q 'DATABASE_URL=.*@pgbouncer:6432/' "$COMPOSE_FILE" \
+                || step_fail "$COMPOSE_FILE DATABASE_URL does not point at pgbouncer"
+            grep -q 'DATABASE_DIRECT_URL=.*@db:5432/' "$COMPOSE_FILE" \
+                || step_fail "$COMPOSE_FILE missing DATABASE_DIRECT_URL for migrations"
             ;;
-        postgres-redis)
+        postgres-redis|postgres-redis-fast)
             grep -q '  db:' "$COMPOSE_FILE" \
-                || step_fail "$COMPOSE_FILE missing 'db' service for --services postgres-redis"
+                || step_fail "$COMPOSE_FILE missing 'db' service for --services $SERVICES"
             grep -q '  redis:' "$COMPOSE_FILE" \
-                || step_fail "$COMPOSE_FILE missing 'redis' service for --services postgres-redis"
+                || step_fail "$COMPOSE_FILE missing 'redis' service for --services $SERVICES"
             ;;
     esac
+    # Fast profiles keep the database in memory without durability.
+    if [[ "$SERVICES" == *-fast ]]; then
+        grep -q 'fsync=off' "$COMPOSE_FILE" \
+            || step_fail "$COMPOSE_FILE missing 'fsync=off' for --services $SERVICES"
+        grep -q 'tmpfs:' "$COMPOSE_FILE" \
+            || step_fail "$COMPOSE_FILE missing tmpfs data directory for --services $SERVICES"
+    fi
     step_pass "docker-compose.yml present with expected services"
 fi
 
@@ -1,7 +1,82 @@
 """Root-level test configuration."""
 
+import json
+import os
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
 import pytest
 
+BENCHMARK_BASELINES = Path(__file__).parent / "benchmarks" / "baselines.json"
+# Allowed slowdown over the baseline before a benchmark fails (1.0 = twice as slow)
+BENCHMARK_THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", "1.0"))
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--benchmark-save",
+        action="store_true",
+        default=False,
+        help="Record benchmark results as the new baselines instead of comparing against them",
+    )
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    """Skip benchmarks unless they were selected with ``-m benchmark``."""
+    if "benchmark" in (config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="benchmark: run with -m benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def _calibrate() -> float:
+    """Time a fixed CPU and file I/O workload, so baselines carry over between machines."""
+    best = float("inf")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "calibration.bin"
+        for _ in range(5):
+            start = time.perf_counter()
+            sum(i * i for i in range(200_000))
+            path.write_bytes(b"x" * (1 << 20))
+            path.read_bytes()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture(scope="session")
+def benchmark_baseline(request: pytest.FixtureRequest) -> Iterator[Callable[[str, float], None]]:
+    """Compare benchmark timings against the stored baselines.
+
+    Timings are stored relative to a calibration workload. Call the fixture with a
+    benchmark name and its best wall time in seconds; it fails the test if the time
+    exceeds the baseline by more than ``BENCHMARK_THRESHOLD``. With ``--benchmark-save``
+    the results replace the baselines at the end of the session instead.
+    """
+    save = request.config.getoption("--benchmark-save")
+    calibration = _calibrate()
+    stored = json.loads(BENCHMARK_BASELINES.read_text()) if BENCHMARK_BASELINES.exists() else {}
+    results: dict[str, float] = {}
+
+    def check(name: str, seconds: float) -> None:
+        relative = seconds / calibration
+        results[name] = round(relative, 4)
+        if save or name not in stored:
+            return
+        limit = stored[name] * (1 + BENCHMARK_THRESHOLD)
+        assert relative <= limit, (
+            f"{name} regressed: {relative:.2f}x calibration (baseline {stored[name]:.2f}x, limit {limit:.2f}x)"
+        )
+
+    yield check
+
+    if save and results:
+        BENCHMARK_BASELINES.parent.mkdir(exist_ok=True)
+        BENCHMARK_BASELINES.write_text(json.dumps({**stored, **results}, indent=2, sort_keys=True) + "\n")
+
 
 @pytest.fixture
 def sample_fixture():
@@ -0,0 +1,416 @@
+"""Tests for .devcontainer/init-firewall.sh -- allowlist parsing and ipset loading with stubbed network tools."""
+
+import json
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+FIREWALL = Path(__file__).parent.parent / ".devcontainer" / "init-firewall.sh"
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("bash") is None or shutil.which("jq") is None, reason="bash and jq required"
+)
+
+GITHUB_META = {
+    "web": ["140.82.112.0/20", "192.30.252.0/22"],
+    "api": ["140.82.112.0/20"],
+    "git": ["185.199.108.0/22"],
+}
+
+# Stub commands: curl serves meta.json, dig serves dig/<domain> after DIG_DELAY
+# seconds, aggregate passes CIDRs through, ipset lists the members file as its
+# live set, and all of them log their arguments (ipset also keeps restore batches).
+STUBS = {
+    "curl": 'echo "curl $*" >> "$STUB_DIR/calls.log"; cat "$STUB_DIR/meta.json" 2>/dev/null',
+    "dig": 'echo "dig $*" >> "$STUB_DIR/calls.log"; sleep "${DIG_DELAY:-0}"; cat "$STUB_DIR/dig/${!#}" 2>/dev/null',
+    "aggregate": "sort -u",
+    "iptables": 'echo "iptables $*" >> "$STUB_DIR/calls.log"; exit "${IPTABLES_EXIT:-0}"',
+    "ipset": """\
+echo "ipset $*" >> "$STUB_DIR/calls.log"
+case "$1 $2" in
+    "-exist restore") cat >> "$STUB_DIR/restore.batch" ;;
+    "list -name") [ -f "$STUB_DIR/set-exists" ] ;;
+    "list "*) printf 'Name: %s\\nType: hash:net\\nMembers:\\n' "$2"; cat "$STUB_DIR/members" 2>/dev/null || true ;;
+esac""",
+}
+
+
+@pytest.fixture
+def stub_dir(tmp_path: Path) -> Path:
+    """Directory holding stub commands and their canned responses."""
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "dig").mkdir()
+    for name, body in STUBS.items():
+        path = tmp_path / "bin" / name
+        path.write_text(f"#!/bin/bash\n{body}\n")
+        path.chmod(0o755)
+    (tmp_path / "meta.json").write_text(json.dumps(GITHUB_META))
+    return tmp_path
+
+
+def _answer(stub_dir: Path, domain: str, *records: str) -> None:
+    """Serve ``dig +noall +answer`` output for ``domain``; records are ``TYPE value`` strings."""
+    lines = [f"{domain}.\t300\tIN\t{record.replace(' ', chr(9))}" for record in records]
+    (stub_dir / "dig" / domain).write_text("\n".join(lines) + "\n")
+
+
+def _env(stub_dir: Path, **env: str) -> dict[str, str]:
+    """Environment with the stubs first on PATH and the cache and lock kept in ``stub_dir``."""
+    return {
+        **os.environ,
+        "PATH": f"{stub_dir / 'bin'}:{os.environ['PATH']}",
+        "STUB_DIR": str(stub_dir),
+        "FIREWALL_CACHE": str(stub_dir / "cache" / "allowlist"),
+        "FIREWALL_LOCK": str(stub_dir / "firewall.lock"),
+        **env,
+    }
+
+
+def _run(stub_dir: Path, script: str, **env: str) -> subprocess.CompletedProcess[str]:
+    """Source init-firewall.sh with the stubs first on PATH, then run ``script``."""
+    return subprocess.run(
+        ["bash", "-c", f'source "{FIREWALL}"\nSETTINGS_DIR="{stub_dir}/settings"\n{script}'],
+        capture_output=True,
+        text=True,
+        env=_env(stub_dir, **env),
+    )
+
+
+def _calls(stub_dir: Path, command: str) -> list[str]:
+    """Return the logged invocations of a stub command."""
+    log = stub_dir / "calls.log"
+    lines = log.read_text().splitlines() if log.exists() else []
+    return [line for line in lines if line.split()[0] == command]
+
+
+def _write_cache(stub_dir: Path, *records: tuple[str, int, str]) -> None:
+    """Write an allowlist cache of ``(source, expires, entry)`` records."""
+    cache = stub_dir / "cache" / "allowlist"
+    cache.parent.mkdir(exist_ok=True)
+    lines = ["# init-firewall allowlist cache v1", *(" ".join(map(str, record)) for record in records)]
+    cache.write_text("\n".join(lines) + "\n")
+
+
+class TestSourcing:
+    """Sourcing the script must only define functions; executing it must still configure the firewall."""
+
+    def test_source_has_no_side_effects(self, stub_dir: Path) -> None:
+        result = _run(stub_dir, "declare -F load_allowlist collect_allowlist")
+        assert result.returncode == 0, result.stderr
+        assert not (stub_dir / "calls.log").exists()
+
+    def test_executing_runs_main(self, stub_dir: Path) -> None:
+        env = _env(stub_dir, IPTABLES_EXIT="1")
+        result = subprocess.run(["bash", str(FIREWALL)], capture_output=True, text=True, env=env)
+        assert result.returncode == 0
+        assert "Skipping firewall setup" in result.stdout
+
+
+class TestAllowlist:
+    """GitHub ranges and DNS answers must be validated before they reach the ipset."""
+
+    def test_github_cidrs(self, stub_dir: Path) -> None:
+        result = _run(stub_dir, "fetch_github_cidrs")
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ["140.82.112.0/20", "185.199.108.0/22", "192.30.252.0/22"]
+
+    @pytest.mark.parametrize(
+        ("meta", "error"),
+        [
+            ("", "Failed to fetch GitHub IP ranges"),
+            (json.dumps({"web": ["1.2.3.0/24"]}), "missing required fields"),
+            (json.dumps({**GITHUB_META, "git": ["not-a-cidr"]}), "Invalid CIDR range from GitHub meta: not-a-cidr"),
+        ],
+    )
+    def test_github_meta_errors(self, stub_dir: Path, meta: str, error: str) -> None:
+        (stub_dir / "meta.json").write_text(meta)
+        result = _run(stub_dir, "fetch_github_cidrs")
+        assert result.returncode == 1
+        assert error in result.stderr
+
+    def test_resolve_domain_keeps_valid_a_records(self, stub_dir: Path) -> None:
+        _answer(stub_dir, "pypi.org", "CNAME dualstack.pypi.org.", "A 151.101.0.223", "A bogus", "A 151.101.64.223")
+        result = _run(stub_dir, "resolve_domain pypi.org; resolve_domain missing.example")
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ["151.101.0.223", "151.101.64.223"]
+        assert "Invalid IP from DNS for pypi.org: bogus" in result.stderr
+        assert "Failed to resolve missing.example" in result.stderr
+
+    def test_collect_allowlist_includes_webfetch_domains(self, stub_dir: Path) -> None:
+        (stub_dir / "settings").mkdir()
+        (stub_dir / "settings" / "settings.json").write_text(
+            json.dumps({"permissions": {"allow": ["WebFetch(domain:docs.example.org)", "WebFetch(domain:*.cdn.net)"]}})
+        )
+        _answer(stub_dir, "astral.sh", "A 104.26.0.1")
+        _answer(stub_dir, "docs.example.org", "A 93.184.216.34")
+        result = _run(stub_dir, "collect_allowlist")
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == [
+            "140.82.112.0/20",
+            "185.199.108.0/22",
+            "192.30.252.0/22",
+            "104.26.0.1",
+            "93.184.216.34",
+        ]
+        assert "Wildcard domain '*.cdn.net'" in result.stderr
+
+
+class TestLoadAllowlist:
+    """The allowlist must be loaded with one ipset restore into a temporary set, then swapped in."""
+
+    def test_single_restore_then_swap(self, stub_dir: Path) -> None:
+        (stub_dir / "set-exists").touch()
+        result = _run(stub_dir, "printf '10.0.0.0/8\\n\\n1.2.3.4\\n' | load_allowlist allowed-domains")
+        assert result.returncode == 0, result.stderr
+        assert (stub_dir / "restore.batch").read_text().splitlines() == [
+            "create allowed-domains-new hash:net family inet",
+            "flush allowed-domains-new",
+            "add allowed-domains-new 10.0.0.0/8",
+            "add allowed-domains-new 1.2.3.4",
+        ]
+        assert (stub_dir / "calls.log").read_text().splitlines() == [
+            "ipset -exist restore",
+            "ipset list -name allowed-domains",
+            "ipset swap allowed-domains-new allowed-domains",
+            "ipset destroy allowed-domains-new",
+        ]
+
+    def test_first_load_renames_temporary_set(self, stub_dir: Path) -> None:
+        result = _run(stub_dir, "echo 1.2.3.4 | load_allowlist allowed-domains")
+        assert result.returncode == 0, result.stderr
+        calls = (stub_dir / "calls.log").read_text().splitlines()
+        assert calls[-1] == "ipset rename allowed-domains-new allowed-domains"
+
+
+class TestResolverCache:
+    """Domains must resolve concurrently, and restarts must reuse the TTL-stamped cache."""
+
+    def test_domains_resolve_concurrently(self, stub_dir: Path) -> None:
+        start = time.perf_counter()
+        result = _run(stub_dir, "collect_records > /dev/null", DIG_DELAY="0.5")
+        elapsed = time.perf_counter() - start
+        assert result.returncode == 0, result.stderr
+        assert len(_calls(stub_dir, "dig")) == 11
+        assert elapsed < 3.0, f"11 lookups of 0.5s took {elapsed:.1f}s"
+
+    def test_dns_server_is_configurable(self, stub_dir: Path) -> None:
+        result = _run(stub_dir, "resolve_records astral.sh", FIREWALL_DNS_SERVER="10.0.0.53", FIREWALL_DNS_PORT="5353")
+        assert result.returncode == 0, result.stderr
+        assert _calls(stub_dir, "dig") == ["dig +time=2 +tries=2 @10.0.0.53 -p 5353 +noall +answer A astral.sh"]
+
+    @pytest.mark.parametrize(
+        ("server", "port"), [("evil.example", "53"), ("10.0.0.53 -j ACCEPT", "53"), ("256.0.0.1", "53"), ("", "0")]
+    )
+    def test_invalid_dns_settings_are_rejected(self, stub_dir: Path, server: str, port: str) -> None:
+        env = _env(stub_dir, FIREWALL_DNS_SERVER=server, FIREWALL_DNS_PORT=port)
+        result = subprocess.run(["bash", str(FIREWALL), "--refresh"], capture_output=True, text=True, env=env)
+        assert result.returncode == 1
+        assert "ERROR: Invalid DNS" in result.stderr
+        assert not (stub_dir / "calls.log").exists()
+
+    def test_dns_server_cannot_be_passed_as_argument(self, stub_dir: Path) -> None:
+        result = subprocess.run(
+            ["bash", str(FIREWALL), "--dns-server", "evil.example"], capture_output=True, text=True, env=_env(stub_dir)
+        )
+        assert result.returncode == 1
+        assert "Unknown argument: --dns-server" in result.stderr
+        assert not (stub_dir / "calls.log").exists()
+
+    def test_records_carry_ttl_expiry(self, stub_dir: Path) -> None:
+        _answer(stub_dir, "astral.sh", "A 104.26.0.1")
+        before = int(time.time())
+        result = _run(stub_dir, "resolve_records astral.sh; resolve_records unknown.example")
+        assert result.returncode == 0, result.stderr
+        (domain, expires, ip), negative = (line.split() for line in result.stdout.splitlines())
+        assert (domain, ip) == ("astral.sh", "104.26.0.1")
+        assert before + 300 <= int(expires) <= int(time.time()) + 300
+        assert negative[0] == "unknown.example" and negative[2] == "-"
+
+    def test_restart_within_ttl_reuses_cache(self, stub_dir: Path) -> None:
+        _answer(stub_dir, "astral.sh", "A 104.26.0.1")
+        first = _run(stub_dir, "records=$(collect_records); write_cache <<< \"$records\"; collect_allowlist")
+        assert first.returncode == 0, first.stderr
+        (stub_dir / "calls.log").unlink()
+
+        second = _run(stub_dir, "collect_allowlist")
+        assert second.returncode == 0, second.stderr
+        assert second.stdout.split()[-1] == "104.26.0.1"
+        assert sorted(second.stdout.split()) == sorted(first.stdout.split()[-4:])
+        assert _calls(stub_dir, "dig") == [] and _calls(stub_dir, "curl") == []
+
+    def test_expired_records_are_used_then_refreshed(self, stub_dir: Path) -> None:
+        now = int(time.time())
+        fresh = [(domain, now + 600, "-") for domain in ("pypi.org", "files.pythonhosted.org", "claude.ai")]
+        github = ("api.github.com/meta", now + 600, "140.82.112.0/20")
+        _write_cache(stub_dir, github, ("astral.sh", now - 60, "1.1.1.1"), *fresh)
+        _answer(stub_dir, "astral.sh", "A 104.26.0.1")
+
+        startup = _run(stub_dir, "collect_allowlist")
+        assert startup.returncode == 0, startup.stderr
+        assert "1.1.1.1" in startup.stdout.split()
+        assert not any(call.endswith(" astral.sh") for call in _calls(stub_dir, "dig"))
+
+        (stub_dir / "set-exists").touch()
+        refresh = _run(stub_dir, "refresh_allowlist")
+        assert refresh.returncode == 0, refresh.stderr
+        assert any(call.endswith(" astral.sh") for call in _calls(stub_dir, "dig"))
+        assert not any(call.endswith(" pypi.org") for call in _calls(stub_dir, "dig"))
+        assert _calls(stub_dir, "curl") == []
+        batch = (stub_dir / "restore.batch").read_text()
+        assert "add allowed-domains-new 104.26.0.1" in batch and "1.1.1.1" not in batch
+        assert " 104.26.0.1" in (stub_dir / "cache" / "allowlist").read_text()
+
+    def test_records_past_stale_grace_are_resolved_again(self, stub_dir: Path) -> None:
+        now = int(time.time())
+        github = ("api.github.com/meta", now - 360, "140.82.112.0/20")
+        _write_cache(stub_dir, github, ("astral.sh", now - 360, "1.1.1.1"))
+        result = _run(stub_dir, "collect_allowlist")
+        assert result.returncode == 0, result.stderr
+        assert "1.1.1.1" not in result.stdout.split()
+        assert len(_calls(stub_dir, "curl")) == 1
+        assert any(call.endswith(" astral.sh") for call in _calls(stub_dir, "dig"))
+
+
+class StubDNSServer:
+    """Answer A queries over UDP on localhost from a fixed ``{name: (ips, ttl)}`` table."""
+
+    def __init__(self, answers: dict[str, tuple[list[str], int]]) -> None:
+        self.answers = answers
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self) -> "StubDNSServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            try:
+                query, addr = self.sock.recvfrom(4096)
+            except TimeoutError:
+                continue
+            self.sock.sendto(self._reply(query), addr)
+
+    def _reply(self, query: bytes) -> bytes:
+        (query_id,) = struct.unpack("!H", query[:2])
+        labels, pos = [], 12
+        while query[pos]:
+            labels.append(query[pos + 1 : pos + 1 + query[pos]].decode())
+            pos += 1 + query[pos]
+        qtype = struct.unpack("!H", query[pos + 1 : pos + 3])[0]
+        question = query[12 : pos + 5]
+        name = ".".join(labels).lower()
+        ips, ttl = self.answers.get(name, ([], 0)) if qtype == 1 else ([], 0)
+        rcode = 0 if name in self.answers else 3
+        header = struct.pack("!HHHHHH", query_id, 0x8180 | rcode, 1, len(ips), 0, 0)
+        records = b"".join(
+            b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, ttl, 4) + socket.inet_aton(ip) for ip in ips
+        )
+        return header + question + records
+
+
+@pytest.mark.skipif(shutil.which("dig") is None, reason="dig not installed")
+class TestStubDNSServer:
+    """Resolution must work end to end with real dig against a configured DNS server."""
+
+    def test_resolves_through_configured_server(self, stub_dir: Path) -> None:
+        (stub_dir / "bin" / "dig").unlink()
+        answers = {"pypi.org": (["151.101.0.223", "151.101.64.223"], 60), "astral.sh": (["104.26.0.1"], 3600)}
+        with StubDNSServer(answers) as server:
+            before = int(time.time())
+            result = _run(
+                stub_dir,
+                "resolve_parallel pypi.org astral.sh missing.example",
+                FIREWALL_DNS_SERVER="127.0.0.1",
+                FIREWALL_DNS_PORT=str(server.port),
+            )
+        assert result.returncode == 0, result.stderr
+        records = [line.split() for line in result.stdout.splitlines()]
+        assert [(r[0], r[2]) for r in records] == [
+            ("pypi.org", "151.101.0.223"),
+            ("pypi.org", "151.101.64.223"),
+            ("astral.sh", "104.26.0.1"),
+            ("missing.example", "-"),
+        ]
+        assert before + 60 <= int(records[0][1]) <= before + 62
+        assert before + 3600 <= int(records[2][1]) <= before + 3602
+
+
+class TestIncrementalRefresh:
+    """--refresh must diff against the live ipset and swap only on change, without touching iptables."""
+
+    def _prepare(self, stub_dir: Path, members: list[str]) -> None:
+        now = int(time.time())
+        fresh = [(domain, now + 600, "-") for domain in ("pypi.org", "claude.ai")]
+        _write_cache(stub_dir, ("api.github.com/meta", now + 600, "140.82.112.0/20"), *fresh)
+        (stub_dir / "set-exists").touch()
+        (stub_dir / "members").write_text("".join(f"{member}\n" for member in members))
+        _answer(stub_dir, "astral.sh", "A 104.26.0.1")
+
+    def _refresh(self, stub_dir: Path) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            ["bash", str(FIREWALL), "--refresh"], capture_output=True, text=True, env=_env(stub_dir)
+        )
+
+    def test_unchanged_set_is_left_alone(self, stub_dir: Path) -> None:
+        self._prepare(stub_dir, ["104.26.0.1", "140.82.112.0/20"])
+        result = self._refresh(stub_dir)
+        assert result.returncode == 0, result.stderr
+        assert "allowed-domains is up to date (2 entries)" in result.stdout
+        assert _calls(stub_dir, "iptables") == []
+        assert not any(call.startswith(("ipset -exist restore", "ipset swap")) for call in _calls(stub_dir, "ipset"))
+
+    def test_changes_are_swapped_in_without_flushing(self, stub_dir: Path) -> None:
+        self._prepare(stub_dir, ["140.82.112.0/20", "151.101.0.223"])
+        result = self._refresh(stub_dir)
+        assert result.returncode == 0, result.stderr
+        assert "Updated allowed-domains: 1 added, 1 removed" in result.stdout
+        assert _calls(stub_dir, "iptables") == []
+        assert "ipset swap allowed-domains-new allowed-domains" in _calls(stub_dir, "ipset")
+        assert (stub_dir / "restore.batch").read_text().splitlines()[2:] == [
+            "add allowed-domains-new 104.26.0.1",
+            "add allowed-domains-new 140.82.112.0/20",
+        ]
+
+    def test_refresh_requires_live_set(self, stub_dir: Path) -> None:
+        self._prepare(stub_dir, [])
+        (stub_dir / "set-exists").unlink()
+        result = self._refresh(stub_dir)
+        assert result.returncode == 1
+        assert "run init-firewall.sh without --refresh first" in result.stderr
+
+    def test_next_refresh_follows_earliest_expiry(self, stub_dir: Path) -> None:
+        now = int(time.time())
+        _write_cache(stub_dir, ("astral.sh", now + 120, "104.26.0.1"), ("pypi.org", now + 90, "151.101.0.223"))
+        result = _run(stub_dir, "next_refresh_delay 300; next_refresh_delay 60; CACHE_FILE=; next_refresh_delay 60")
+        assert result.returncode == 0, result.stderr
+        first, capped, empty = (int(value) for value in result.stdout.split())
+        assert 88 <= first <= 90 and capped == 60 and empty == 60
+
+    def test_daemon_keeps_refreshing(self, stub_dir: Path) -> None:
+        self._prepare(stub_dir, ["104.26.0.1", "140.82.112.0/20"])
+        env = _env(stub_dir, FIREWALL_MIN_REFRESH_INTERVAL="1")
+        daemon = subprocess.Popen(
+            ["bash", str(FIREWALL), "--daemon", "--interval", "1"], stdout=subprocess.PIPE, text=True, env=env
+        )
+        time.sleep(2.5)
+        daemon.terminate()
+        output = daemon.communicate()[0]
+        assert output.count("Refreshing expired allowlist entries") >= 2
+        assert _calls(stub_dir, "iptables") == []
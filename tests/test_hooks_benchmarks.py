@@ -0,0 +1,104 @@
+"""Benchmarks for the hook secret scanner on 10 MB payloads.
+
+Skipped by default; run with ``pytest -m benchmark`` and record new baselines with
+``pytest -m benchmark --benchmark-save``.
+"""
+
+import importlib.util
+import random
+import string
+import time
+from pathlib import Path
+
+import pytest
+
+HOOKS_DIR = Path(__file__).parent.parent / ".claude" / "hooks"
+
+
+def _load_hook_module(name: str):
+    spec = importlib.util.spec_from_file_location(name, HOOKS_DIR / f"{name}.py")
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+scanner_module = _load_hook_module("secret_scanner")
+blocker = _load_hook_module("dangerous_actions_blocker")
+
+pytestmark = pytest.mark.benchmark
+
+PAYLOAD_SIZE = 10 * 1024 * 1024
+RULE_COUNTS = (10, 100, 1000)
+REPEAT = 3
+# Scanning 100x the rules may cost at most this factor more (a scan per rule would cost ~100x)
+MAX_GROWTH = 5.0
+
+WORDS = "static text with no secrets def return self import value config path /usr/local/bin uv run pytest".split()
+
+
+def heredoc_command(size: int, seed: int = 0) -> str:
+    """Return a shell command writing ``size`` characters of code-like text without secrets."""
+    rng = random.Random(seed)
+    identifier_chars = string.ascii_letters + string.digits + "_"
+    lines = ["cat <<'EOF' > generated.txt\n"]
+    total = 0
+    while total < size:
+        tokens = [
+            rng.choice(WORDS) if rng.random() < 0.8 else "".join(rng.choices(identifier_chars, k=rng.randint(3, 14)))
+            for _ in range(rng.randint(4, 12))
+        ]
+        line = " ".join(tokens) + "\n"
+        lines.append(line)
+        total += len(line)
+    lines.append("EOF")
+    return "".join(lines)
+
+
+def signatures(count: int, seed: int = 0) -> list:
+    """Return the blocker's signatures plus synthetic vendor-style token signatures, ``count`` in total."""
+    rng = random.Random(seed)
+    result = [scanner_module.Signature(*rule) for rule in blocker.RULES]
+    prefixes = set()
+    while len(result) < count:
+        prefix = "".join(rng.choices(string.ascii_lowercase + string.digits, k=4)) + "_"
+        if prefix not in prefixes:
+            prefixes.add(prefix)
+            result.append(scanner_module.Signature(prefix, prefix + r"[A-Za-z0-9]{24}\b", f"token {prefix}"))
+    return result
+
+
+@pytest.fixture(scope="module")
+def payload() -> str:
+    return heredoc_command(PAYLOAD_SIZE)
+
+
+def best_scan_time(scanner, text: str) -> float:
+    """Return the best wall time of a full scan of ``text`` over ``REPEAT`` runs."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        assert scanner.first(text) is None
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture(scope="module")
+def scan_times(payload: str) -> dict[int, float]:
+    return {count: best_scan_time(scanner_module.SecretScanner(signatures(count)), payload) for count in RULE_COUNTS}
+
+
+@pytest.mark.parametrize("count", RULE_COUNTS)
+def test_scan_10mb(scan_times, benchmark_baseline, count: int) -> None:
+    benchmark_baseline(f"secret_scanner_10mb[{count}]", scan_times[count])
+
+
+def test_scan_cost_stays_flat(scan_times) -> None:
+    fewest, most = RULE_COUNTS[0], RULE_COUNTS[-1]
+    growth = scan_times[most] / scan_times[fewest]
+    assert growth < MAX_GROWTH, f"{most} rules took {growth:.1f}x as long as {fewest} rules"
+
+
+def test_scan_10mb_with_entropy_check(payload: str, benchmark_baseline) -> None:
+    scanner = scanner_module.SecretScanner(signatures(RULE_COUNTS[0]), entropy_threshold=4.5)
+    benchmark_baseline("secret_scanner_10mb_entropy", best_scan_time(scanner, payload))
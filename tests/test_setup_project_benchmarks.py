@@ -0,0 +1,176 @@
+"""Benchmarks for setup_project.py steps on synthetic templates.
+
+Skipped by default; run with ``pytest -m benchmark`` and record new baselines with
+``pytest -m benchmark --benchmark-save``.
+"""
+
+import importlib.util
+import json
+import random
+import shutil
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location("setup_project", Path(__file__).parent.parent / "setup_project.py")
+assert _spec and _spec.loader
+_mod = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_mod)
+
+pytestmark = pytest.mark.benchmark
+
+# Placeholders are assembled at runtime so rendering the template does not substitute them
+REPLACEMENTS = {
+    "{{" + name + "}}": value
+    for name, value in {
+        "project_name": "bench-project",
+        "namespace": "bench_project",
+        "description": "A benchmark project",
+        "author_name": "Bench Author",
+        "author_email": "bench@example.com",
+        "python_version": "3.11",
+        "base_branch": "main",
+        "year": "2026",
+    }.items()
+}
+NS_DIR, PROJECT_NAME = "{{" + "namespace" + "}}", "{{" + "project_name" + "}}"
+NAMESPACE = REPLACEMENTS[NS_DIR]
+REPEAT = 5
+
+
+@dataclass(frozen=True)
+class SyntheticTemplate:
+    """Shape of a generated template tree."""
+
+    files: int
+    file_size: int
+    density: float
+    depth: int
+    namespace_dirs: int
+
+    def build(self, root: Path, seed: int = 0) -> Path:
+        """Write the template below ``root`` and return ``root``.
+
+        The tree holds the example ``core``/``server`` packages and a devcontainer
+        config, ``files`` filler text files spread ``depth`` directories deep, where
+        ``density`` of the lines carry a placeholder, and ``namespace_dirs`` extra
+        namespace placeholder directories.
+        """
+        rng = random.Random(seed)
+        placeholders = list(REPLACEMENTS)
+        for kind, name in (("libs", "core"), ("apps", "server")):
+            pkg = root / kind / name
+            (pkg / NS_DIR / name).mkdir(parents=True)
+            (pkg / NS_DIR / name / "__init__.py").write_text(f'"""{PROJECT_NAME} {name}."""\n')
+            (pkg / "tests").mkdir()
+            (pkg / "tests" / "__init__.py").write_text("")
+            (pkg / "pyproject.toml").write_text(
+                f'[project]\nname = "{PROJECT_NAME}-{name}"\ndescription = "{name.title()} package"\n'
+                f'dependencies = []\n\n[tool.hatch.build.targets.wheel]\npackages = ["{NS_DIR}"]\n'
+            )
+        (root / "pyproject.toml").write_text(
+            f'[project]\nname = "{PROJECT_NAME}"\n\n[tool.uv.workspace]\nmembers = ["libs/*", "apps/*"]\n'
+        )
+        (root / ".devcontainer").mkdir()
+        (root / ".devcontainer" / "devcontainer.json").write_text(
+            json.dumps({"name": PROJECT_NAME, "build": {"dockerfile": "Dockerfile"}, "runArgs": []}, indent=2)
+        )
+
+        for i in range(self.files):
+            parts = [f"d{(i >> level) % 4}" for level in range(self.depth)]
+            path = root / "docs" / Path(*parts) / f"file{i}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lines = []
+            total = 0
+            while total < self.file_size:
+                if rng.random() < self.density:
+                    line = f"value = {rng.choice(placeholders)}  # templated line\n"
+                else:
+                    line = "static text with no substitution at all\n"
+                lines.append(line)
+                total += len(line)
+            path.write_text("".join(lines))
+
+        for i in range(self.namespace_dirs):
+            ns_dir = root / "plugins" / f"p{i}" / NS_DIR
+            ns_dir.mkdir(parents=True)
+            (ns_dir / "plugin.py").write_text(f"NAME = '{NS_DIR}'\n")
+        return root
+
+
+PRESETS = {
+    "small": SyntheticTemplate(files=200, file_size=2048, density=0.1, depth=3, namespace_dirs=4),
+    "large": SyntheticTemplate(files=2000, file_size=8192, density=0.05, depth=6, namespace_dirs=64),
+}
+
+
+def best_time(prepare: Callable[[], Path], run: Callable[[Path], object]) -> float:
+    """Return the best wall time of ``run`` over ``REPEAT`` fresh copies made by ``prepare``."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        root = prepare()
+        start = time.perf_counter()
+        run(root)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture(params=list(PRESETS))
+def template_copies(request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory):
+    """Yield the preset name and a factory of fresh copies of its synthetic template."""
+    source = PRESETS[request.param].build(tmp_path_factory.mktemp(f"template-{request.param}"))
+    counter = iter(range(1_000_000))
+
+    def prepare(namespaced: bool = False) -> Path:
+        copy = tmp_path_factory.mktemp(f"copy-{request.param}") / str(next(counter))
+        shutil.copytree(source, copy)
+        if namespaced:
+            _mod.rename_namespace_dirs(copy, NAMESPACE)
+        return copy
+
+    return request.param, prepare
+
+
+def test_replace_in_file(template_copies, benchmark_baseline) -> None:
+    preset, prepare = template_copies
+    pattern = _mod.compile_placeholders(REPLACEMENTS)
+
+    def run(root: Path) -> None:
+        for path in _mod.scan_template(root).text_files:
+            _mod.replace_in_file(path, REPLACEMENTS, pattern)
+
+    benchmark_baseline(f"replace_in_file[{preset}]", best_time(prepare, run))
+
+
+def test_rename_namespace_dirs(template_copies, benchmark_baseline) -> None:
+    preset, prepare = template_copies
+    seconds = best_time(prepare, lambda root: _mod.rename_namespace_dirs(root, NAMESPACE))
+    benchmark_baseline(f"rename_namespace_dirs[{preset}]", seconds)
+
+
+def test_flatten_to_single_package(template_copies, benchmark_baseline) -> None:
+    preset, prepare = template_copies
+    seconds = best_time(
+        lambda: prepare(namespaced=True), lambda root: _mod.flatten_to_single_package(root, NAMESPACE)
+    )
+    benchmark_baseline(f"flatten_to_single_package[{preset}]", seconds)
+
+
+def test_rename_packages(template_copies, benchmark_baseline) -> None:
+    preset, prepare = template_copies
+    packages = ["engine", "lib:utils", "daemon", "worker"]
+    seconds = best_time(
+        lambda: prepare(namespaced=True), lambda root: _mod.rename_packages(root, NAMESPACE, packages)
+    )
+    benchmark_baseline(f"rename_packages[{preset}]", seconds)
+
+
+def test_configure_devcontainer_services(template_copies, benchmark_baseline) -> None:
+    preset, prepare = template_copies
+    seconds = best_time(
+        prepare, lambda root: _mod.configure_devcontainer_services(root, "postgres-redis", REPLACEMENTS)
+    )
+    benchmark_baseline(f"configure_devcontainer_services[{preset}]", seconds)